@@ -1,8 +1,4 @@
 import streamlit as st
-import tempfile
-import os
-import time
-from pathlib import Path
 
 # --- Page Setup (MUST BE FIRST) ---
 st.set_page_config(
@@ -11,20 +7,27 @@ st.set_page_config(
     layout="wide"
 )
 
+# Startup profiling (PROFILE_STARTUP=1) has to hook imports before the modules below load
+from utils import startup_profiler
+startup_profiler.install()
+
 # Custom modules (make sure they are in your project)
-from app.summarizer import LegalDocumentSummarizer
-from app.utils import save_uploaded_file
-from config import show_sidebar  # Remove setup_page import
-from utils.dataset_loader import load_combined_datasets
-from utils.embedding_search import search_similar_cases
-from utils.gemini_interface import generate_case_summary, generate_answer
-from utils.case_predictor import CasePredictor
-
-# Import tab modules
-from tabs.legal_analysis import show_legal_analysis_tab
-from tabs.case_prediction import show_case_prediction_tab
-from tabs.document_summary import show_document_summary_tab
-from tabs.document_generator import show_document_generator_tab
+# Heavy libraries (torch, shap, sklearn, datasets, google.generativeai, docx, fpdf)
+# are imported inside the features that use them, not here
+with startup_profiler.stage("app imports"):
+    from app.summarizer import LegalDocumentSummarizer
+    from config import show_sidebar, show_search_filters  # Remove setup_page import
+    from utils.dataset_loader import load_combined_datasets, load_bm25_index, load_metadata_table
+    from utils.query_cache import get_query_cache
+    from utils.retrieval_service import RetrievalService
+    from utils.summary_cache import get_summary_cache
+    from utils.case_predictor import CasePredictor
+
+    # Import tab modules
+    from tabs.legal_analysis import show_legal_analysis_tab
+    from tabs.case_prediction import show_case_prediction_tab
+    from tabs.document_summary import show_document_summary_tab
+    from tabs.document_generator import show_document_generator_tab
 
 # Main title and description
 st.title("⚖️ Verdict AI : Legal AI Assistant")
@@ -37,7 +40,7 @@ Welcome to your all-in-one legal AI platform. This application provides:
 """)
 
 # Sidebar setup
-api_key, num_cases = show_sidebar()
+api_key, num_cases, retrieval_mode = show_sidebar()
 
 # API key session state
 if 'api_key' not in st.session_state:
@@ -55,14 +58,16 @@ if not api_key or api_key.strip() == "":
     st.stop()
 
 # Initialize assistants
-if 'assistant' not in st.session_state:
-    st.session_state.assistant = LegalDocumentSummarizer(api_key)
+with startup_profiler.stage("assistants"):
+    if 'assistant' not in st.session_state:
+        st.session_state.assistant = LegalDocumentSummarizer(api_key)
 
-if 'case_predictor' not in st.session_state:
-    st.session_state.case_predictor = CasePredictor(api_key)
+    if 'case_predictor' not in st.session_state:
+        st.session_state.case_predictor = CasePredictor(api_key)
 
 # Load Datasets (only for analysis features)
-@st.cache_data
+# cache_resource keeps one shared copy; cache_data would pickle the embedder and index on every run
+@st.cache_resource
 def load_legal_datasets():
     try:
         questions, answers, embedder, index, dataset_info = load_combined_datasets()
@@ -71,22 +76,65 @@ def load_legal_datasets():
         st.error(f"❌ Failed to load datasets: {str(e)}")
         return None, None, None, None, None, False
 
-questions, answers, embedder, index, dataset_info, datasets_loaded = load_legal_datasets()
+with startup_profiler.stage("datasets, index & embedder"):
+    questions, answers, embedder, index, dataset_info, datasets_loaded = load_legal_datasets()
+
+# One background worker batches query encoding and index search across all sessions
+# (underscore arguments are not hashed by st.cache_resource)
+@st.cache_resource
+def load_retrieval_service(_index, _questions, _answers):
+    return RetrievalService(_index, _questions, _answers)
+
+with startup_profiler.stage("retrieval service"):
+    retrieval_service = load_retrieval_service(index, questions, answers) if datasets_loaded else None
 
 if datasets_loaded:
     st.success(f"✅ Loaded {len(questions):,} legal cases for analysis")
     with st.expander("📊 Dataset Info"):
         for info in dataset_info:
             st.write(f"**{info['name']}:** {info['count']:,} cases")
+            if info.get("duplicates_removed"):
+                st.caption(f"{info['duplicates_removed']:,} near-duplicate cases removed")
+        cache_stats = get_query_cache().stats()
+        st.caption(
+            f"Query embedding cache: {cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses "
+            f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['entries']:,} entries)"
+        )
+        summary_cache = get_summary_cache()
+        if summary_cache is not None:
+            summary_stats = summary_cache.stats()
+            st.caption(
+                f"Case summary cache: {summary_stats['hits']:,} hits / {summary_stats['misses']:,} misses "
+                f"({summary_stats['hit_rate']:.0%} hit rate, {summary_stats['entries']:,} entries)"
+            )
+        service_stats = retrieval_service.stats()
+        st.caption(
+            f"Retrieval service: {service_stats['requests']:,} queries in {service_stats['batches']:,} batches "
+            f"(mean batch size {service_stats['mean_batch_size']:.1f})"
+        )
+
+# Keyword index for hybrid retrieval
+with startup_profiler.stage("bm25 index"):
+    bm25_index = load_bm25_index() if datasets_loaded else None
+
+# Per-case source / year / court for filtered search
+with startup_profiler.stage("metadata table"):
+    metadata_table = load_metadata_table() if datasets_loaded else None
+search_filters = show_search_filters(metadata_table)
 
 # Create shared context for tabs
 tab_context = {
     'api_key': api_key,
     'num_cases': num_cases,
+    'retrieval_mode': retrieval_mode,
+    'bm25': bm25_index,
+    'metadata': metadata_table,
+    'filters': search_filters,
     'questions': questions,
     'answers': answers,
     'embedder': embedder,
     'index': index,
+    'retrieval': retrieval_service,
     'dataset_info': dataset_info,
     'datasets_loaded': datasets_loaded,
     'assistant': st.session_state.assistant,
@@ -102,17 +150,25 @@ tab1, tab2, tab3, tab4 = st.tabs([
 ])
 
 # Call individual tab functions
-with tab1:
-    show_legal_analysis_tab(tab_context)
+with startup_profiler.stage("first tab render"):
+    with tab1:
+        show_legal_analysis_tab(tab_context)
+
+    with tab2:
+        show_case_prediction_tab(tab_context)
 
-with tab2:
-    show_case_prediction_tab(tab_context)
+    with tab3:
+        show_document_summary_tab(tab_context)
 
-with tab3:
-    show_document_summary_tab(tab_context)
+    with tab4:
+        show_document_generator_tab(tab_context)
 
-with tab4:
-    show_document_generator_tab()
+if startup_profiler.ENABLED:
+    startup_profiler.print_report(once=True)
+    with st.expander("⏱️ Startup profile"):
+        profile = startup_profiler.report()
+        st.table(profile["stages"])
+        st.table(profile["imports"])
 
 # Footer
 st.markdown("---")
@@ -1,7 +1,5 @@
 # app/document_loader.py
 from pathlib import Path
-from PyPDF2 import PdfReader
-import docx
 
 class DocumentLoader:
     def load_document(self, file_path: str) -> str:
@@ -16,6 +14,7 @@ class DocumentLoader:
             raise ValueError("Unsupported file format")
 
     def _load_pdf(self, file_path: str) -> str:
+        from PyPDF2 import PdfReader
         text = ""
         with open(file_path, "rb") as f:
             reader = PdfReader(f)
@@ -24,6 +23,7 @@ class DocumentLoader:
         return text
 
     def _load_docx(self, file_path: str) -> str:
+        import docx
         doc = docx.Document(file_path)
         return "\n".join([p.text for p in doc.paragraphs])
 
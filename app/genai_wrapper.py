@@ -1,65 +1,71 @@
 # app/genai_wrapper.py
-
-import google.generativeai as genai
+from utils.gemini_client import get_client_pool
 
 class GeminiSummarizer:
     def __init__(self, api_key: str):
         if not api_key or api_key.strip().lower() == "your_gemini_api_key_here":
             raise ValueError("❌ API key missing or invalid. Check your .env or config.")
-        
-        try:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel("models/gemini-1.5-flash-latest")
-        except Exception as e:
-            raise RuntimeError(f"❌ Failed to initialize Gemini model: {e}")
+        self.api_key = api_key
+        self._model = None
+
+    @property
+    def model(self):
+        # A handle on the shared client pool; the Gemini SDK is loaded on the first request
+        if self._model is None:
+            self._model = get_client_pool().model(self.api_key, "models/gemini-1.5-flash-latest")
+        return self._model
 
 
-    def executive_summary(self, text: str) -> str:
+    def executive_summary(self, text: str, stream: bool = False):
         return self._call_model(
-            f"Summarize the following legal text into an executive summary:\n\n{text}"
+            f"Summarize the following legal text into an executive summary:\n\n{text}", stream
         )
 
-    def detailed_summary(self, text: str) -> str:
+    def detailed_summary(self, text: str, stream: bool = False):
         return self._call_model(
-            f"Provide a detailed summary of the following legal document:\n\n{text}"
+            f"Provide a detailed summary of the following legal document:\n\n{text}", stream
         )
 
-    def key_points(self, text: str) -> str:
+    def key_points(self, text: str, stream: bool = False):
         return self._call_model(
-            f"Extract key points from the following legal text:\n\n{text}"
+            f"Extract key points from the following legal text:\n\n{text}", stream
         )
 
-    def roles_and_parties(self, text: str) -> str:
+    def roles_and_parties(self, text: str, stream: bool = False):
         return self._call_model(
-            f"List all involved roles and parties in this legal text:\n\n{text}"
+            f"List all involved roles and parties in this legal text:\n\n{text}", stream
         )
 
-    def timeline(self, text: str) -> str:
+    def timeline(self, text: str, stream: bool = False):
         return self._call_model(
-            f"Create a timeline of key events based on the following legal text:\n\n{text}"
+            f"Create a timeline of key events based on the following legal text:\n\n{text}", stream
         )
 
-    def risk_analysis(self, text: str) -> str:
+    def risk_analysis(self, text: str, stream: bool = False):
         return self._call_model(
-            f"Analyze and list the potential risks in the following legal document:\n\n{text}"
+            f"Analyze and list the potential risks in the following legal document:\n\n{text}", stream
         )
 
-    def comprehensive_analysis(self, text: str) -> str:
+    def comprehensive_analysis(self, text: str, stream: bool = False):
         return self._call_model(
-            f"Give a comprehensive legal analysis of this document:\n\n{text}"
+            f"Give a comprehensive legal analysis of this document:\n\n{text}", stream
         )
 
-    def custom_summary(self, text: str, prompt: str) -> str:
-        return self._call_model(f"{prompt.strip()}\n\n{text}")
+    def custom_summary(self, text: str, prompt: str, stream: bool = False):
+        return self._call_model(f"{prompt.strip()}\n\n{text}", stream)
 
-    def answer_query_with_context(self, uploaded_text: str, query: str, similar_docs_context: str = None) -> str:
+    def answer_query_with_context(self, uploaded_text: str, query: str, similar_docs_context: str = None,
+                                  stream: bool = False):
         context = uploaded_text.strip()
         if similar_docs_context:
             context += f"\n\nSimilar Documents:\n{similar_docs_context.strip()}"
         prompt = f"Answer the question based on the text below.\nQuestion: {query}\n\nText:\n{context}"
-        return self._call_model(prompt)
+        return self._call_model(prompt, stream)
 
-    def _call_model(self, prompt: str) -> str:
+    def _call_model(self, prompt: str, stream: bool = False):
+        """The response text, or with stream=True an iterator of text pieces as they are generated"""
+        if stream:
+            return self._stream_model(prompt)
         try:
             response = self.model.generate_content(prompt)
             if hasattr(response, "text"):
@@ -70,3 +76,14 @@ class GeminiSummarizer:
                 return "⚠️ No response text generated."
         except Exception as e:
             return f"❌ Error generating content: {str(e)}"
+
+    def _stream_model(self, prompt: str):
+        try:
+            yielded = False
+            for text in self.model.stream_text(prompt):
+                yielded = True
+                yield text
+            if not yielded:
+                yield "⚠️ No response text generated."
+        except Exception as e:
+            yield f"❌ Error generating content: {str(e)}"
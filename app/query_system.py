@@ -1,11 +1,18 @@
-import faiss
 import numpy as np
 
 class DocumentQuerySystem:
     def __init__(self):
-        self.index = faiss.IndexFlatL2(768)
+        self._index = None
         self.documents = []
 
+    @property
+    def index(self):
+        # faiss is only imported once a document index is actually needed
+        if self._index is None:
+            import faiss
+            self._index = faiss.IndexFlatL2(768)
+        return self._index
+
     def get_similar_documents(self, query_text: str, k: int = 5):
         if not self.documents or self.index.ntotal == 0:
             return []  # No documents or empty index
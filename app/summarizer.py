@@ -23,11 +23,17 @@ class LegalDocumentSummarizer:
         except Exception as e:
             return f"Error processing query: {e}"
 
-    def summarize_document(self, file_path: str, summary_type: str, custom_prompt: str = None) -> str:
+    def summarize_document(self, file_path: str, summary_type: str, custom_prompt: str = None, stream: bool = False):
+        """The summary text; with stream=True, an iterator of text pieces of the final summary
+
+        Per-chunk summaries of long documents are still generated in full
+        first, since they feed the final summary.
+        """
         try:
             text = self.loader.load_document(file_path)
         except Exception as e:
-            return f"Error loading document: {e}"
+            message = f"Error loading document: {e}"
+            return iter([message]) if stream else message
 
         chunks = self.processor.chunk_text(text)
 
@@ -37,11 +43,11 @@ class LegalDocumentSummarizer:
                 for i, chunk in enumerate(chunks)
             ]
             combined = "\n\n".join(chunk_summaries)
-            return self._get_summary(combined, summary_type, custom_prompt)
+            return self._get_summary(combined, summary_type, custom_prompt, stream)
         else:
-            return self._get_summary(text, summary_type, custom_prompt)
+            return self._get_summary(text, summary_type, custom_prompt, stream)
 
-    def _get_summary(self, text: str, summary_type: str, custom_prompt: str = None) -> str:
+    def _get_summary(self, text: str, summary_type: str, custom_prompt: str = None, stream: bool = False):
         summary_func_map = {
             "executive": self.summarizer.executive_summary,
             "detailed": self.summarizer.detailed_summary,
@@ -50,7 +56,10 @@ class LegalDocumentSummarizer:
             "timeline": self.summarizer.timeline,
             "risk_analysis": self.summarizer.risk_analysis,
             "comprehensive": self.summarizer.comprehensive_analysis,
-            "custom": lambda text: self.summarizer.custom_summary(text, custom_prompt)
+            "custom": lambda text, stream: self.summarizer.custom_summary(text, custom_prompt, stream)
         }
         func = summary_func_map.get(summary_type)
-        return func(text) if func else "Invalid summary type selected"
+        if func is None:
+            message = "Invalid summary type selected"
+            return iter([message]) if stream else message
+        return func(text, stream)
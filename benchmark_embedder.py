@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+SUBJECTS = ["The appellant", "The respondent", "The petitioner", "The State", "The landlord", "The employer",
+            "The accused", "The insurance company", "The tenant", "The bank"]
+ACTIONS = ["challenged the order of the High Court", "sought quashing of the FIR under Section 482 CrPC",
+           "claimed compensation under the Motor Vehicles Act", "appealed against conviction under Section 302 IPC",
+           "filed a writ petition against cancellation of the lease", "sought eviction for bona fide personal need",
+           "invoked the arbitration clause after termination of the contract",
+           "challenged dismissal from service without a domestic enquiry"]
+DETAILS = ["on the ground of delay", "citing violation of natural justice", "relying on the evidence of two witnesses",
+           "after the trial court had decreed the suit", "as the notice was not served", ""]
+
+
+def synthetic_texts(num_texts, seed):
+    """Case-like texts built from templates, mostly short with a long tail (like case descriptions)"""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(num_texts):
+        sentences = [f"{rng.choice(SUBJECTS)} {rng.choice(ACTIONS)} {rng.choice(DETAILS)}".strip() + "."
+                     for _ in range(min(int(rng.geometric(0.2)), 30))]
+        texts.append(" ".join(sentences))
+    return texts
+
+
+def corpus_texts(num_texts, seed):
+    """Questions sampled from the app's corpus store"""
+    from utils.corpus_store import CorpusStore, corpus_exists
+    from utils.dataset_loader import DATA_DIR
+    if not corpus_exists(DATA_DIR):
+        raise SystemExit(f"No corpus store in {DATA_DIR}; run build_index.py or use --texts synthetic")
+    corpus = CorpusStore(DATA_DIR)
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(corpus), size=min(num_texts, len(corpus)), replace=False)
+    return [corpus.questions[int(i)] for i in np.sort(rows)]
+
+
+def _percentiles(seconds, prefix):
+    ms = np.asarray(seconds) * 1000
+    return {f"{prefix}_p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in (50, 95, 99)}
+
+
+def _cosines(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def benchmark_backend(backend, texts, queries, args):
+    from utils.embedder import EMBEDDING_MODEL, encode_corpus, get_embedder
+    start = time.perf_counter()
+    embedder = get_embedder(EMBEDDING_MODEL, backend)
+    load_seconds = time.perf_counter() - start
+
+    # Warm-up so one-off graph / kernel setup isn't counted
+    embedder.encode(texts[:args.batch_size], batch_size=args.batch_size, convert_to_numpy=True)
+
+    # The model's own encode() (fixed batch size), then the length-bucketed corpus path
+    start = time.perf_counter()
+    embedder.encode(texts, batch_size=args.batch_size, convert_to_numpy=True)
+    bulk_seconds = time.perf_counter() - start
+    corpus_vectors, stats = encode_corpus(texts, embedder, token_budget=args.token_budget)
+
+    timings, query_vectors = [], []
+    for query in queries:
+        began = time.perf_counter()
+        query_vectors.append(embedder.encode([query], convert_to_numpy=True)[0])
+        timings.append(time.perf_counter() - began)
+
+    result = {
+        "backend": backend,
+        "actual_backend": getattr(embedder, "backend", "torch"),
+        "load_seconds": round(load_seconds, 3),
+        "sentences_per_second": round(len(texts) / bulk_seconds, 1),
+        "bucketed_sentences_per_second": round(len(texts) / stats["seconds"], 1),
+        "bucketed_tokens_per_second": stats["tokens_per_second"],
+        "bucketed_padding_efficiency": round(stats["tokens"] / max(stats["padded_tokens"], 1), 4),
+        **_percentiles(timings, "query"),
+    }
+    return result, np.asarray(corpus_vectors, dtype="float32"), np.asarray(query_vectors, dtype="float32")
+
+
+def compatibility(reference, candidate, k):
+    """How closely a backend's vectors match the reference backend's, including search results
+
+    recall@k: queries embedded by the candidate, searched against the
+    corpus as embedded by the reference (i.e. the existing index).
+    """
+    import faiss
+    ref_corpus, ref_queries = reference
+    corpus, queries = candidate
+    cosines = _cosines(ref_corpus, corpus)
+    index = faiss.IndexFlatL2(ref_corpus.shape[1])
+    index.add(ref_corpus)
+    k = min(k, len(ref_corpus))
+    truth = index.search(ref_queries, k)[1]
+    found = index.search(queries, k)[1]
+    recall = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+    return {
+        "min_cosine": round(float(cosines.min()), 5),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        f"recall_at_{k}": round(float(recall), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends: sentences/sec, query latency and "
+                                                 "compatibility with the torch embeddings")
+    parser.add_argument("--backends", default="torch,onnx_int8", help="Comma-separated; the first is the reference")
+    parser.add_argument("--texts", choices=["synthetic", "corpus"], default="synthetic",
+                        help="Template sentences, or questions sampled from the app's corpus store")
+    parser.add_argument("--num-texts", type=int, default=2000)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64, help="Batch size of the plain encode() run")
+    parser.add_argument("--token-budget", type=int, default=None,
+                        help="Padded tokens per bucketed batch (default: EMBED_TOKEN_BUDGET)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=None, help="Embedding threads (default: all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    if args.threads:
+        # Read by utils.embedder when each model is loaded
+        os.environ["EMBEDDING_THREADS"] = str(args.threads)
+    from utils.embedder import EMBEDDING_BACKENDS, TOKEN_BUDGET, embedding_threads
+    args.token_budget = args.token_budget or TOKEN_BUDGET
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = [b for b in backends if b not in EMBEDDING_BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(unknown)}")
+
+    texts = synthetic_texts(args.num_texts, args.seed) if args.texts == "synthetic" else corpus_texts(args.num_texts, args.seed)
+    queries = synthetic_texts(args.num_queries, args.seed + 1)
+    print(f"{len(texts):,} texts ({args.texts}), {len(queries):,} queries, {embedding_threads()} threads")
+
+    results, reference = [], None
+    for backend in backends:
+        result, corpus_vectors, query_vectors = benchmark_backend(backend, texts, queries, args)
+        if reference is None:
+            reference = (corpus_vectors, query_vectors)
+        else:
+            result.update(compatibility(reference, (corpus_vectors, query_vectors), args.k))
+            result["speedup"] = round(result["bucketed_sentences_per_second"] /
+                                      results[0]["bucketed_sentences_per_second"], 2)
+        results.append(result)
+        summary = (f"{backend:>10}: {result['sentences_per_second']:,.0f} sentences/s plain, "
+                   f"{result['bucketed_sentences_per_second']:,.0f} bucketed "
+                   f"({result['bucketed_tokens_per_second']:,.0f} tokens/s), "
+                   f"query p50/p95 {result['query_p50_ms']:.2f}/{result['query_p95_ms']:.2f} ms")
+        if "mean_cosine" in result:
+            summary += (f", cosine min/mean {result['min_cosine']:.4f}/{result['mean_cosine']:.4f}, "
+                        f"recall@{args.k} {result[f'recall_at_{args.k}']:.3f}")
+        if result["actual_backend"] == "torch" and backend != "torch":
+            summary += " (fell back to torch)"
+        print(summary)
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "embedding_threads": embedding_threads(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import random
+import re
+import time
+from utils.extractors import extract_case_parts, extract_case_parts_batch
+
+HEADINGS = [
+    "Judgment:", "HELD.", "Decision:", "Ruling.", "The court held:", "It is held.",
+    "Facts:", "Background.", "Case facts:", "Case of the appellant and its facts.",
+    "Analysis:", "Reasoning.", "Legal analysis:",
+    "Conclusion:", "Outcome.", "Result:",
+]
+
+WORDS = (
+    "the appellant respondent petitioner court order section act evidence witness "
+    "property contract tenant landlord appeal high supreme state trial decree "
+    "counsel submitted argued learned judge bench matter dispute held facts case"
+).split()
+
+
+def reference_extract_case_parts(text):
+    """Previous implementation: one finditer pass per pattern"""
+    text = str(text).strip()
+    split_patterns = [
+        r'(?i)(judgment|held|decision|ruling|court.?held|it.?held)[:.]',
+        r'(?i)(facts|background|case.*?facts)[:.]',
+        r'(?i)(analysis|reasoning|legal.*?analysis)[:.]',
+        r'(?i)(conclusion|outcome|result)[:.]'
+    ]
+    for pattern in split_patterns:
+        matches = list(re.finditer(pattern, text))
+        if matches:
+            split_point = matches[0].start()
+            facts, judgment = text[:split_point].strip(), text[split_point:].strip()
+            if len(facts) > 50 and len(judgment) > 50:
+                return facts, judgment
+    split_point = len(text) * 3 // 5
+    return text[:split_point].strip(), text[split_point:].strip()
+
+
+def synthetic_judgment(rng, max_words):
+    """Random judgment-like text with a random number of section headings"""
+    parts = []
+    for _ in range(rng.randint(0, 6)):
+        parts.append(" ".join(rng.choices(WORDS, k=rng.randint(0, max_words // 4))))
+        parts.append(rng.choice(HEADINGS))
+    parts.append(" ".join(rng.choices(WORDS, k=rng.randint(0, max_words // 4))))
+    separator = rng.choice([" ", "\n"])
+    return separator.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extract_case_parts against the previous implementation")
+    parser.add_argument("--num-texts", type=int, default=20000)
+    parser.add_argument("--max-words", type=int, default=4000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    texts = [synthetic_judgment(rng, args.max_words) for _ in range(args.num_texts)]
+    total_mb = sum(len(t) for t in texts) / 1e6
+    print(f"Generated {len(texts):,} synthetic judgments ({total_mb:.1f} MB)")
+
+    start = time.perf_counter()
+    expected = [reference_extract_case_parts(t) for t in texts]
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = extract_case_parts_batch(texts)
+    new_seconds = time.perf_counter() - start
+
+    mismatches = [i for i, (e, a) in enumerate(zip(expected, actual)) if e != a]
+    print(f"Previous implementation: {reference_seconds:.2f}s ({len(texts) / reference_seconds:,.0f} texts/sec)")
+    print(f"Compiled splitter:       {new_seconds:.2f}s ({len(texts) / new_seconds:,.0f} texts/sec)")
+    print(f"Speed-up: {reference_seconds / new_seconds:.2f}x")
+    print(f"Identical splits: {len(texts) - len(mismatches):,}/{len(texts):,}")
+    if mismatches:
+        i = mismatches[0]
+        print(f"First mismatch at text {i}: {extract_case_parts(texts[i])!r:.200}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+
+
+def _one_request(pool, api_key, model, prompt, stream):
+    start = time.perf_counter()
+    try:
+        if stream:
+            "".join(pool.stream_text(prompt, api_key, model))
+        else:
+            pool.generate_text(prompt, api_key, model)
+        return time.perf_counter() - start, None
+    except Exception as e:
+        return time.perf_counter() - start, str(e)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(
+        description="Load-test Gemini calls through the shared client pool, with its rate limiter and retries. "
+                    "Meant for fake_gemini_server.py: set GEMINI_API_ENDPOINT=http://127.0.0.1:8765"
+    )
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once (like app sessions)")
+    parser.add_argument("--api-key", default=os.getenv("GEMINI_API_KEY", "fake-key"),
+                        help="Gemini API key (default: GEMINI_API_KEY)")
+    parser.add_argument("--model", default=None, help="Model name (default: the app's)")
+    parser.add_argument("--stream", action="store_true", help="Stream responses instead of waiting for them")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    from utils.gemini_client import API_ENDPOINT, DEFAULT_MODEL, get_client_pool
+    from utils.rate_limiter import BURST, REQUESTS_PER_MINUTE
+    if not API_ENDPOINT:
+        print("Warning: GEMINI_API_ENDPOINT is not set, so this calls the real Gemini API and uses your quota")
+    limiter = f"{REQUESTS_PER_MINUTE:g} RPM per key, burst {BURST}" if REQUESTS_PER_MINUTE > 0 else "off (GEMINI_RPM=0)"
+    print(f"{args.requests} requests, {args.concurrency} at a time; limiter: {limiter}")
+
+    pool = get_client_pool()
+    model = args.model or DEFAULT_MODEL
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(
+            lambda i: _one_request(pool, args.api_key, model, f"Benchmark prompt {i}", args.stream),
+            range(args.requests),
+        ))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([seconds for seconds, _ in results]) * 1000
+    errors = [error for _, error in results if error]
+    report = {
+        "requests": args.requests,
+        "ok": args.requests - len(errors),
+        "failed": len(errors),
+        "elapsed_s": round(elapsed, 2),
+        "achieved_rpm": round(args.requests / elapsed * 60, 1),
+        **{f"latency_p{p}_ms": round(float(np.percentile(latencies, p)), 1) for p in (50, 95, 99)},
+        "pool": pool.stats(),
+    }
+    if API_ENDPOINT:
+        # Counters of fake_gemini_server.py, e.g. how many requests it rejected with 429
+        from urllib.request import urlopen
+        try:
+            with urlopen(f"{API_ENDPOINT.rstrip('/')}/stats", timeout=5) as response:
+                report["server"] = json.load(response)
+        except Exception as e:
+            print(f"Could not read server stats: {str(e)}")
+    print(json.dumps(report, indent=2))
+    for error in sorted(set(errors))[:5]:
+        print(f"Error: {error[:200]}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import faiss
+import numpy as np
+from utils.index_factory import (
+    INDEX_TYPES, DEFAULT_INDEX_PARAMS, build_index, apply_search_params, base_index, RerankedIndex, recall
+)
+
+# Metrics where a higher value is a regression; everything else compared is higher-is-better
+LOWER_IS_BETTER = ("build_seconds", "index_bytes", "cold_p50_ms", "cold_p95_ms",
+                   "cold_p99_ms", "warm_p50_ms", "warm_p95_ms", "warm_p99_ms")
+# Reported but too noisy (allocator reuse) to gate on
+NOT_COMPARED = ("rss_delta_bytes",)
+
+
+def synthetic_corpus(num_docs, num_queries, dim, seed):
+    """Clustered unit vectors (roughly how sentence embeddings spread out) plus held-out queries"""
+    rng = np.random.default_rng(seed)
+    num_clusters = max(1, int(np.sqrt(num_docs + num_queries)))
+    centres = rng.standard_normal((num_clusters, dim)).astype("float32")
+    labels = rng.integers(num_clusters, size=num_docs + num_queries)
+    vectors = centres[labels] + 0.5 * rng.standard_normal((len(labels), dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.ascontiguousarray(vectors[:num_docs]), np.ascontiguousarray(vectors[num_docs:])
+
+
+def sampled_corpus(num_docs, num_queries, seed):
+    """Rows of the app's cached embeddings file; held-out rows serve as queries"""
+    from utils.dataset_loader import VECTORS_PATH, INDEX_PATH
+    if not os.path.exists(VECTORS_PATH):
+        raise SystemExit(f"No cached embeddings at {VECTORS_PATH}; run the app once or use --corpus synthetic")
+    dim = faiss.read_index(INDEX_PATH).d
+    vectors = np.memmap(VECTORS_PATH, dtype="float32", mode="r").reshape(-1, dim)
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), size=min(num_docs + num_queries, len(vectors)), replace=False)
+    sample = np.ascontiguousarray(vectors[np.sort(rows)], dtype="float32")
+    rng.shuffle(sample)
+    return sample[num_queries:], sample[:num_queries]
+
+
+def _rss_bytes():
+    """Resident set size of this process, or None where /proc isn't available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _percentiles(seconds, prefix):
+    ms = np.asarray(seconds) * 1000
+    return {f"{prefix}_p{p}_ms": round(float(np.percentile(ms, p)), 4) for p in (50, 95, 99)}
+
+
+def _single_query_latencies(index, queries, k):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query[None, :], k)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _queries_per_second(index, queries, k, batch_size, min_seconds=0.5):
+    """Throughput when queries arrive in batches of batch_size, repeating the set until min_seconds"""
+    done, elapsed = 0, 0.0
+    while elapsed < min_seconds:
+        for start in range(0, len(queries), batch_size):
+            batch = queries[start:start + batch_size]
+            began = time.perf_counter()
+            index.search(batch, k)
+            elapsed += time.perf_counter() - began
+            done += len(batch)
+    return round(done / elapsed, 1)
+
+
+def _reload(index, params, vectors):
+    """Write the index to disk and read it back, as the app does at startup"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.index")
+        faiss.write_index(base_index(index), path)
+        loaded = faiss.read_index(path)
+    if params.get("rerank_oversample"):
+        loaded = RerankedIndex(loaded, vectors, params["rerank_oversample"])
+    apply_search_params(loaded, params)
+    return loaded
+
+
+def benchmark_index(index_type, corpus, queries, truth, args):
+    rss_before = _rss_bytes()
+    start = time.perf_counter()
+    index, params = build_index(corpus, index_type)
+    if params.get("rerank_oversample"):
+        index = RerankedIndex(index, corpus, params["rerank_oversample"])
+    build_seconds = time.perf_counter() - start
+    rss_after = _rss_bytes()
+
+    index_bytes = int(faiss.serialize_index(base_index(index)).nbytes)
+    if isinstance(index, RerankedIndex):
+        # The float32 vectors file is memory-mapped alongside the compressed index
+        index_bytes += int(corpus.nbytes)
+
+    # Cold: the first queries after loading the index from disk
+    cold = _reload(index, params, corpus)
+    cold_timings = _single_query_latencies(cold, queries[:args.cold_queries], args.k)
+    del cold
+
+    # Warm: after a warm-up pass over the whole query set
+    _single_query_latencies(index, queries, args.k)
+    warm_timings = _single_query_latencies(index, queries, args.k)
+
+    result = {
+        "index_type": index_type,
+        "params": {key: value for key, value in params.items() if not key.startswith("recall")},
+        "build_seconds": round(build_seconds, 3),
+        "index_bytes": index_bytes,
+        "rss_delta_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        f"recall_at_{args.k}": round(recall(truth, index.search(queries, args.k)[1]), 4),
+        **_percentiles(cold_timings, "cold"),
+        **_percentiles(warm_timings, "warm"),
+        "qps": {str(b): _queries_per_second(index, queries, args.k, b) for b in args.batch_sizes},
+    }
+    return result
+
+
+def _flatten(result):
+    flat = {key: value for key, value in result.items() if isinstance(value, (int, float)) and value is not None}
+    flat.update({f"qps_batch_{b}": qps for b, qps in result.get("qps", {}).items()})
+    return flat
+
+
+def compare(results, baseline, max_regression):
+    """Metrics that got worse than baseline by more than max_regression (a fraction)"""
+    previous = {r["index_type"]: _flatten(r) for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result["index_type"])
+        if old is None:
+            continue
+        for metric, value in _flatten(result).items():
+            before = old.get(metric)
+            if not before or metric in NOT_COMPARED:
+                continue
+            if metric in LOWER_IS_BETTER:
+                change = (value - before) / before
+            else:
+                change = (before - value) / before
+            if change > max_regression:
+                regressions.append({"index_type": result["index_type"], "metric": metric,
+                                    "baseline": before, "current": value, "change": round(change, 4)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS retrieval: latency, throughput, build time, memory and recall")
+    parser.add_argument("--corpus", choices=["synthetic", "sampled"], default="synthetic",
+                        help="Random clustered vectors, or a sample of the app's cached embeddings")
+    parser.add_argument("--num-docs", type=int, default=100_000)
+    parser.add_argument("--num-queries", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=384, help="Vector size for the synthetic corpus")
+    parser.add_argument("--index-types", default=",".join(INDEX_TYPES),
+                        help=f"Comma-separated subset of {', '.join(INDEX_TYPES)}")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-sizes", default="1,8,32,128", help="Batch sizes for the queries/sec runs")
+    parser.add_argument("--cold-queries", type=int, default=50, help="Single queries timed right after loading")
+    parser.add_argument("--threads", type=int, default=None, help="FAISS OpenMP threads (default: all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier JSON output to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail when a metric is this much worse than the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+    args.batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    if args.num_queries < 1:
+        parser.error("--num-queries must be at least 1")
+    if min(args.batch_sizes) < 1:
+        parser.error("--batch-sizes must all be at least 1")
+    index_types = [t.strip() for t in args.index_types.split(",") if t.strip()]
+    unknown = [t for t in index_types if t not in DEFAULT_INDEX_PARAMS]
+    if unknown:
+        parser.error(f"unknown index types: {', '.join(unknown)}")
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+
+    if args.corpus == "synthetic":
+        corpus, queries = synthetic_corpus(args.num_docs, args.num_queries, args.dim, args.seed)
+    else:
+        corpus, queries = sampled_corpus(args.num_docs, args.num_queries, args.seed)
+    print(f"Corpus: {len(corpus):,} x {corpus.shape[1]} ({args.corpus}), {len(queries):,} queries")
+
+    # Exact neighbours of the held-out queries, the recall baseline for every index type
+    flat = faiss.IndexFlatL2(corpus.shape[1])
+    flat.add(corpus)
+    truth = flat.search(queries, args.k)[1]
+    del flat
+
+    results = []
+    for index_type in index_types:
+        result = benchmark_index(index_type, corpus, queries, truth, args)
+        results.append(result)
+        print(f"{index_type:>8}: build {result['build_seconds']:.2f}s, {result['index_bytes'] / 1e6:.1f} MB, "
+              f"recall@{args.k} {result[f'recall_at_{args.k}']:.3f}, "
+              f"warm p50/p99 {result['warm_p50_ms']:.3f}/{result['warm_p99_ms']:.3f} ms, "
+              f"cold p99 {result['cold_p99_ms']:.3f} ms, "
+              f"qps {', '.join(f'{b}:{q:,.0f}' for b, q in result['qps'].items())}")
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "faiss": getattr(faiss, "__version__", None),
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+            "faiss_threads": faiss.omp_get_max_threads(),
+        },
+        "results": results,
+    }
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(results, json.load(f), args.max_regression)
+        for regression in report["regressions"]:
+            print(f"REGRESSION {regression['index_type']} {regression['metric']}: "
+                  f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.0%})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if report.get("regressions"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import argparse
+import os
+from utils.offline_build import DEFAULT_SHARD_SIZE, STAGING_DIR, run_build
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the case corpus, embeddings and indexes offline, then publish them for the app"
+    )
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                        help="Records per embedding checkpoint")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("EMBED_WORKERS", "1")),
+                        help="Embedding worker processes (each loads its own model)")
+    parser.add_argument("--restart", action="store_true",
+                        help=f"Discard checkpoints in {STAGING_DIR} instead of resuming")
+    args = parser.parse_args()
+    run_build(shard_size=args.shard_size, num_workers=args.workers, restart=args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,13 @@ def show_sidebar():
             value=5,
             help="Select how many similar cases to show in analysis"
         )
+
+        retrieval_mode = st.selectbox(
+            "Retrieval mode:",
+            options=["hybrid", "dense"],
+            format_func=lambda mode: {"hybrid": "Hybrid (keywords + semantic)", "dense": "Semantic only"}[mode],
+            help="Hybrid also matches exact statute sections, case numbers and party names"
+        )
         
         st.markdown("---")
         
@@ -60,7 +67,35 @@ def show_sidebar():
             The API key is free to use with generous limits.
             """)
     
-    return api_key, num_cases
+    return api_key, num_cases, retrieval_mode
+
+def show_search_filters(metadata):
+    """Sidebar filters over case metadata; returns a filters dict for search, or None"""
+    if metadata is None:
+        return None
+    with st.sidebar:
+        st.subheader("🔎 Search Filters")
+        sources = st.multiselect(
+            "Datasets:",
+            options=metadata.source_names,
+            help="Only search cases from these datasets (leave empty for all)"
+        )
+        courts = st.multiselect(
+            "Courts:",
+            options=sorted(metadata.court_names),
+            help="Only search cases from these courts (leave empty for all)"
+        )
+        year_range = None
+        years = metadata.year_range()
+        if years and years[0] < years[1]:
+            selected = st.slider("Judgment year:", min_value=years[0], max_value=years[1], value=years)
+            # The full range means no year filter, so cases without a known year stay searchable
+            if tuple(selected) != tuple(years):
+                year_range = tuple(selected)
+        st.markdown("---")
+
+    filters = {"sources": sources, "year_range": year_range, "courts": courts}
+    return filters if any(filters.values()) else None
 
 def get_app_config():
     """Return app configuration settings"""
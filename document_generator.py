@@ -2,15 +2,12 @@
 
 import re
 import os
-import google.generativeai as genai
 from io import BytesIO
-from docx import Document
-from fpdf import FPDF
+from utils.gemini_client import generate_text, stream_text
 
-# Configure Gemini
+# The Gemini SDK, docx and fpdf are imported where they are used, so the
+# generator tab costs nothing at startup
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
 
 # Template descriptions
 DOCUMENT_DESCRIPTIONS = {
@@ -86,15 +83,22 @@ def load_template(path):
             return f.read()
     return ""
 
-def generate_clause(prompt):
+def generate_clause(prompt, api_key=None):
     try:
-        model = genai.GenerativeModel("gemini-1.5-flash")
-
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        # Shared per-key Gemini clients; GOOGLE_API_KEY is what genai.configure() used to fall back to
+        api_key = api_key or GEMINI_API_KEY or os.getenv("GOOGLE_API_KEY")
+        return generate_text(prompt, api_key)
     except Exception as e:
         return f"[Error generating clause: {e}]"
 
+def stream_clause(prompt, api_key=None):
+    """generate_clause as an iterator of text pieces, for rendering while the clause is written"""
+    try:
+        api_key = api_key or GEMINI_API_KEY or os.getenv("GOOGLE_API_KEY")
+        yield from stream_text(prompt, api_key)
+    except Exception as e:
+        yield f"[Error generating clause: {e}]"
+
 def validate_inputs(inputs):
     for key, value in inputs.items():
         if not value.strip():
@@ -102,6 +106,7 @@ def validate_inputs(inputs):
     return True
 
 def export_to_docx(text):
+    from docx import Document
     doc = Document()
     for line in text.splitlines():
         doc.add_paragraph(line)
@@ -110,6 +115,7 @@ def export_to_docx(text):
     return buffer
 
 def export_to_pdf(text):
+    from fpdf import FPDF
     pdf = FPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
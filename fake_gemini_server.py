@@ -0,0 +1,154 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# POST /v1beta/models/<model>:generateContent or :streamGenerateContent, as the REST API
+ROUTE = re.compile(r"^/v1(?:beta)?/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$")
+
+
+class FakeGemini:
+    """State of the fake API: per-key request times for the quota, and counters"""
+
+    def __init__(self, rpm, error_rate, latency_ms, chunks):
+        self.rpm = rpm
+        self.error_rate = error_rate
+        self.latency_ms = latency_ms
+        self.chunks = max(1, chunks)
+        self._requests = defaultdict(deque)   # api key -> times of its requests in the last minute
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "errors": 0, "max_rpm_seen": 0}
+
+    def admit(self, api_key):
+        """None if the request may proceed, else (HTTP status, gRPC status name, message)"""
+        now = time.monotonic()
+        with self._lock:
+            self.stats["requests"] += 1
+            window = self._requests[api_key]
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if self.rpm and len(window) >= self.rpm:
+                self.stats["rate_limited"] += 1
+                return 429, "RESOURCE_EXHAUSTED", f"Quota exceeded: {self.rpm} requests per minute"
+            window.append(now)
+            self.stats["max_rpm_seen"] = max(self.stats["max_rpm_seen"], len(window))
+            if random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 503, "UNAVAILABLE", "The model is overloaded. Please try again later."
+            self.stats["ok"] += 1
+        return None
+
+    def response_chunks(self, model, body):
+        prompt = " ".join(part.get("text", "") for content in body.get("contents", [])
+                          for part in content.get("parts", []))
+        words = f"Fake {model} response to a {len(prompt)}-character prompt.".split()
+        size = -(-len(words) // self.chunks)
+        pieces = [" ".join(words[i:i + size]) + " " for i in range(0, len(words), size)]
+        return [{
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": piece}]},
+                "index": 0,
+                **({"finishReason": "STOP"} if i == len(pieces) - 1 else {}),
+            }],
+        } for i, piece in enumerate(pieces)]
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/stats":
+                with fake._lock:
+                    self._send_json(200, dict(fake.stats))
+            else:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            match = ROUTE.match(url.path)
+            if match is None:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                return
+            api_key = self.headers.get("x-goog-api-key") or parse_qs(url.query).get("key", [None])[0]
+            if not api_key:
+                self._send_json(403, {"error": {"code": 403, "message": "API key missing",
+                                                "status": "PERMISSION_DENIED"}})
+                return
+            rejected = fake.admit(api_key)
+            if rejected is not None:
+                status, name, message = rejected
+                self._send_json(status, {"error": {"code": status, "message": message, "status": name}})
+                return
+
+            time.sleep(fake.latency_ms / 1000)
+            chunks = fake.response_chunks(match["model"], body)
+            if match["method"] == "generateContent":
+                text = "".join(c["candidates"][0]["content"]["parts"][0]["text"] for c in chunks)
+                chunks[-1]["candidates"][0]["content"]["parts"][0]["text"] = text
+                self._send_json(200, chunks[-1])
+            else:
+                # Streamed like the real API without alt=sse: one JSON array, sent element by element
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, chunk in enumerate(chunks):
+                    piece = ("[" if i == 0 else ",\r\n") + json.dumps(chunk)
+                    if i == len(chunks) - 1:
+                        piece += "]"
+                    self._write_chunk(piece.encode("utf-8"))
+                    time.sleep(fake.latency_ms / 1000 / len(chunks))
+                self._write_chunk(b"")
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the Gemini REST API, for testing rate limiting and retries. "
+                    "Point the app at it with GEMINI_API_ENDPOINT=http://127.0.0.1:<port>"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rpm", type=int, default=60, help="Requests per minute allowed per API key (0: no quota)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 503")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Time to generate each response")
+    parser.add_argument("--chunks", type=int, default=4, help="Pieces a streamed response is split into")
+    args = parser.parse_args()
+
+    fake = FakeGemini(args.rpm, args.error_rate, args.latency_ms, args.chunks)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(fake))
+    print(f"Fake Gemini API on http://127.0.0.1:{args.port} ({args.rpm or 'unlimited'} RPM per key, "
+          f"{args.error_rate:.0%} errors); GET /stats for counters")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(fake.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 import streamlit as st
 import tempfile
 import os
-from utils.embedding_search import search_similar_cases
-from utils.gemini_interface import generate_case_summary
+from utils.embedding_search import search_similar_cases_long, PASSAGE_CHARS
+from utils.summary_executor import summarize_cases
 
 def show_case_prediction_tab(context):
     """Case Outcome Prediction Tab"""
@@ -47,27 +47,33 @@ def show_case_prediction_tab(context):
 
             # Analyze document
             with st.spinner("Analyzing document and searching similar cases..."):
-                similar_cases = search_similar_cases(
-                    document_text[:1000], 
-                    context['index'], 
-                    context['questions'], 
-                    context['answers'], 
-                    context['num_cases']
+                search_options = dict(
+                    mode=context['retrieval_mode'],
+                    bm25=context['bm25'],
+                    filters=context['filters'],
+                    metadata=context['metadata']
                 )
-                
-                summarized_cases = []
-                for case in similar_cases:
-                    summary = generate_case_summary(
-                        case['question'], 
-                        case['answer'], 
-                        context['api_key']
+                if len(document_text) > PASSAGE_CHARS:
+                    # Long documents are searched with all of their passages in one batch
+                    similar_cases = search_similar_cases_long(
+                        document_text, 
+                        context['index'], 
+                        context['questions'], 
+                        context['answers'], 
+                        context['num_cases'],
+                        **search_options
                     )
-                    summarized_cases.append({
-                        "summary": summary, 
-                        "similarity": case['similarity']
-                    })
+                else:
+                    similar_cases = context['retrieval'].search(document_text, context['num_cases'], **search_options)
                 
-                prediction_result = context['case_predictor'].predict_case(document_text, summarized_cases)
+                # All case summaries are generated concurrently
+                summarized_cases = summarize_cases(similar_cases, context['api_key'])
+                
+                # Cases whose summary failed are shown but not learned from
+                prediction_result = context['case_predictor'].predict_case(
+                    document_text,
+                    [case for case in summarized_cases if not case.get("error")]
+                )
 
             # Display prediction result
             confidence = prediction_result['confidence']
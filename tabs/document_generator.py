@@ -4,10 +4,10 @@ import time
 from document_generator import (
     DOCUMENT_DESCRIPTIONS, DOCUMENT_TEMPLATES, PLACEHOLDER_EXAMPLES,
     load_template, extract_placeholders, validate_inputs,
-    generate_clause, export_to_docx, export_to_pdf
+    stream_clause, export_to_docx, export_to_pdf
 )
 
-def show_document_generator_tab():
+def show_document_generator_tab(context):
     """Legal Document Generator Tab"""
     st.header("📃 AI-Powered Legal Document Generator")
     st.markdown("Generate professional legal documents with AI-powered clause creation.")
@@ -73,10 +73,10 @@ def show_document_generator_tab():
                     )
 
                     try:
-                        ai_text = generate_clause(prompt)
+                        # Shown as it is written; write_stream returns the full clause
+                        with st.expander(f"📄 {clause_name}", expanded=True):
+                            ai_text = st.write_stream(stream_clause(prompt, context['api_key']))
                         manual_inputs[ai_ph] = ai_text
-                        with st.expander(f"📄 {clause_name}"):
-                            st.write(ai_text)
                     except Exception as e:
                         manual_inputs[ai_ph] = f"[Error generating {clause_name}: {e}]"
                         st.error(f"Error generating {clause_name}: {e}")
@@ -43,23 +43,26 @@ def show_document_summary_tab(context):
                 generate_summary_btn = st.button("🔍 Generate Summary", type="primary")
 
             if generate_summary_btn:
-                with st.spinner(f"Generating {summary_type[1].lower()}..."):
-                    try:
-                        summary = context['assistant'].summarize_document(file_path, summary_type[0], None)
-                        
-                        st.subheader(f"📄 {summary_type[1]}")
-                        st.markdown(summary)
-                        
-                        # Download option
-                        st.download_button(
-                            label="💾 Download Summary",
-                            data=summary,
-                            file_name=f"summary_{Path(uploaded_doc.name).stem}_{summary_type[0]}.txt",
-                            mime="text/plain"
+                try:
+                    with st.spinner(f"Generating {summary_type[1].lower()}..."):
+                        summary_stream = context['assistant'].summarize_document(
+                            file_path, summary_type[0], None, stream=True
                         )
-                    except Exception as e:
-                        st.error("❌ Error generating summary.")
-                        st.exception(e)
+
+                    # Rendered as it is generated; write_stream returns the full text
+                    st.subheader(f"📄 {summary_type[1]}")
+                    summary = st.write_stream(summary_stream)
+                    
+                    # Download option
+                    st.download_button(
+                        label="💾 Download Summary",
+                        data=summary,
+                        file_name=f"summary_{Path(uploaded_doc.name).stem}_{summary_type[0]}.txt",
+                        mime="text/plain"
+                    )
+                except Exception as e:
+                    st.error("❌ Error generating summary.")
+                    st.exception(e)
 
         with query_tab:
             st.subheader("❓ Ask Questions About the Document")
@@ -74,20 +77,22 @@ def show_document_summary_tab(context):
                 if not prompt.strip():
                     st.error("Please enter a question.")
                 else:
-                    with st.spinner("Processing your query..."):
-                        try:
-                            answer = context['assistant'].summarize_document(file_path, "custom", prompt)
-                            
-                            st.subheader("💡 Answer")
-                            st.markdown(answer)
-                            
-                            # Download option
-                            st.download_button(
-                                label="💾 Download Q&A",
-                                data=f"**Question:** {prompt}\n\n**Answer:** {answer}",
-                                file_name=f"qa_result_{Path(uploaded_doc.name).stem}.txt",
-                                mime="text/plain"
+                    try:
+                        with st.spinner("Processing your query..."):
+                            answer_stream = context['assistant'].summarize_document(
+                                file_path, "custom", prompt, stream=True
                             )
-                        except Exception as e:
-                            st.error("❌ Error processing query.")
-                            st.exception(e)
\ No newline at end of file
+                        
+                        st.subheader("💡 Answer")
+                        answer = st.write_stream(answer_stream)
+                        
+                        # Download option
+                        st.download_button(
+                            label="💾 Download Q&A",
+                            data=f"**Question:** {prompt}\n\n**Answer:** {answer}",
+                            file_name=f"qa_result_{Path(uploaded_doc.name).stem}.txt",
+                            mime="text/plain"
+                        )
+                    except Exception as e:
+                        st.error("❌ Error processing query.")
+                        st.exception(e)
\ No newline at end of file
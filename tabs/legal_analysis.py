@@ -1,7 +1,7 @@
 import streamlit as st
 import time
-from utils.embedding_search import search_similar_cases
-from utils.gemini_interface import generate_case_summary, generate_answer
+from utils.gemini_interface import stream_answer
+from utils.summary_executor import submit_summaries
 
 def show_legal_analysis_tab(context):
     """Legal Question Analysis Tab"""
@@ -26,51 +26,43 @@ def show_legal_analysis_tab(context):
         if not query:
             st.error("Please enter a legal question.")
         else:
-            with st.spinner("Searching similar cases and generating analysis..."):
-                try:
-                    similar_cases = search_similar_cases(
+            try:
+                with st.spinner("Searching similar cases..."):
+                    # Batched with other sessions' queries by the shared retrieval service
+                    similar_cases = context['retrieval'].search(
                         query, 
-                        context['index'], 
-                        context['questions'], 
-                        context['answers'], 
-                        context['num_cases']
+                        context['num_cases'],
+                        mode=context['retrieval_mode'],
+                        bm25=context['bm25'],
+                        filters=context['filters'],
+                        metadata=context['metadata']
                     )
-                    
-                    # Generate case summaries
-                    summarized_cases = []
-                    progress_bar = st.progress(0)
-                    for i, case in enumerate(similar_cases):
-                        summary = generate_case_summary(
-                            case['question'], 
-                            case['answer'], 
-                            context['api_key']
-                        )
-                        summarized_cases.append({
-                            "summary": summary,
-                            "similarity": case['similarity']
-                        })
-                        progress_bar.progress((i + 1) / len(similar_cases))
-                    
-                    # Generate comprehensive analysis
-                    analysis = generate_answer(query, similar_cases, context['api_key'])
-                    
-                    # Display results
-                    st.subheader("📋 Legal Analysis")
-                    st.markdown(analysis)
-                    
-                    # Download analysis
-                    st.download_button(
-                        label="💾 Download Analysis",
-                        data=f"Query: {query}\n\n{analysis}",
-                        file_name=f"legal_analysis_{int(time.time())}.txt",
-                        mime="text/plain"
-                    )
-                    
-                    st.subheader("📚 Similar Cases (Summarized)")
-                    for i, case in enumerate(summarized_cases, 1):
-                        with st.expander(f"Case {i} - Similarity: {case['similarity']:.1f}%"):
-                            st.markdown(case["summary"])
-                            
-                except Exception as e:
-                    st.error(f"Error during analysis: {str(e)}")
-                    st.exception(e)
\ No newline at end of file
+                
+                # Case summaries are generated in the background while the analysis streams in
+                summaries = submit_summaries(similar_cases, context['api_key'])
+                
+                # Display results as they are generated; write_stream returns the full text
+                st.subheader("📋 Legal Analysis")
+                analysis = st.write_stream(stream_answer(query, similar_cases, context['api_key']))
+                
+                # Download analysis
+                st.download_button(
+                    label="💾 Download Analysis",
+                    data=f"Query: {query}\n\n{analysis}",
+                    file_name=f"legal_analysis_{int(time.time())}.txt",
+                    mime="text/plain"
+                )
+                
+                st.subheader("📚 Similar Cases (Summarized)")
+                progress_bar = st.progress(0)
+                summarized_cases = summaries.result(
+                    on_progress=lambda done, total: progress_bar.progress(done / total)
+                )
+                progress_bar.empty()
+                for i, case in enumerate(summarized_cases, 1):
+                    with st.expander(f"Case {i} - Similarity: {case['similarity']:.1f}%"):
+                        st.markdown(case["summary"])
+                        
+            except Exception as e:
+                st.error(f"Error during analysis: {str(e)}")
+                st.exception(e)
\ No newline at end of file
@@ -0,0 +1,133 @@
+import json
+import os
+import re
+import numpy as np
+
+# Keeps statute sections and case numbers like "138", "s.420" or "1234/2019" as single tokens
+_TOKEN_RE = re.compile(r"\w+(?:[./\-]\w+)*")
+
+# Only the start of each judgment is indexed; case numbers, parties and sections appear early
+MAX_DOC_CHARS = 5000
+
+
+def tokenize(text):
+    """Lowercase word tokens; compound tokens (e.g. "302/34") also emit their parts"""
+    tokens = []
+    for token in _TOKEN_RE.findall(str(text).lower()):
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[./\-]", token) if part)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a case corpus with array-backed (CSR) postings
+
+    Postings for term t are doc_ids[indptr[t]:indptr[t + 1]] with matching
+    term frequencies in tfs. The arrays are plain .npy files, memory-mapped
+    when loaded.
+    """
+
+    def __init__(self, vocab, indptr, doc_ids, tfs, doc_len, k1=1.2, b=0.75, meta=None):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.meta = meta or {}
+        self.num_docs = len(doc_len)
+        self.avg_doc_len = float(np.mean(doc_len)) if self.num_docs else 0.0
+
+    @classmethod
+    def build(cls, documents, max_doc_chars=MAX_DOC_CHARS, meta=None):
+        """Build from an iterable of document texts (doc id = position)"""
+        vocab = {}
+        term_ids, doc_ids, tfs, doc_len = [], [], [], []
+        for doc_id, text in enumerate(documents):
+            counts = {}
+            tokens = tokenize(str(text)[:max_doc_chars])
+            for token in tokens:
+                term_id = vocab.setdefault(token, len(vocab))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            term_ids.extend(counts.keys())
+            tfs.extend(counts.values())
+            doc_ids.extend([doc_id] * len(counts))
+            doc_len.append(len(tokens))
+
+        term_ids = np.array(term_ids, dtype=np.int64)
+        # Stable sort keeps doc ids ascending within each posting list
+        order = np.argsort(term_ids, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=indptr[1:])
+        return cls(
+            vocab,
+            indptr,
+            np.array(doc_ids, dtype=np.int32)[order],
+            np.minimum(np.array(tfs, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16)[order],
+            np.array(doc_len, dtype=np.int32),
+            meta=meta,
+        )
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ("indptr", "doc_ids", "tfs", "doc_len"):
+            np.save(os.path.join(directory, name + ".npy"), getattr(self, name))
+        # Terms in id order
+        terms = [None] * len(self.vocab)
+        for term, term_id in self.vocab.items():
+            terms[term_id] = term
+        with open(os.path.join(directory, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f)
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({**self.meta, "k1": self.k1, "b": self.b}, f)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "vocab.json"), "r", encoding="utf-8") as f:
+            vocab = {term: term_id for term_id, term in enumerate(json.load(f))}
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+            for name in ("indptr", "doc_ids", "tfs", "doc_len")
+        }
+        return cls(vocab, k1=meta.get("k1", 1.2), b=meta.get("b", 0.75), meta=meta, **arrays)
+
+    def search(self, query, k=10, mask=None):
+        """Top-k (doc_ids, scores) for a query, best first, optionally only among ids where mask is True"""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = np.asarray(self.doc_ids[start:end])
+            tf = np.asarray(self.tfs[start:end], dtype=np.float32)
+            df = end - start
+            idf = np.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * np.asarray(self.doc_len[docs]) / max(self.avg_doc_len, 1e-9))
+            # Doc ids are unique within a posting list, so fancy-index += is safe
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if mask is not None:
+            scores[~np.asarray(mask, dtype=bool)] = 0
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = matched[np.argpartition(-scores[matched], min(k, len(matched)) - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return top.astype(np.int64), scores[top]
+
+
+def reciprocal_rank_fusion(rankings, k=10, rrf_k=60):
+    """Fuse several ranked id lists; returns [(id, score)] best first"""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            doc_id = int(doc_id)
+            if doc_id < 0:
+                continue
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda item: -item[1])[:k]
@@ -1,15 +1,11 @@
 import os
-import PyPDF2
-import docx
-import google.generativeai as genai
 import json
-import shap
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.pipeline import Pipeline
-from sklearn.ensemble import RandomForestClassifier
 import warnings
 import re
+from utils.gemini_client import DEFAULT_MODEL as GEMINI_MODEL, get_client_pool
+# google.generativeai, shap, sklearn, PyPDF2 and docx are imported on first use; they
+# add seconds and hundreds of MB to startup even when no case is ever predicted
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
@@ -18,18 +14,32 @@ class CasePredictor:
     def __init__(self, api_key):
         """Initialize the predictor with API key"""
         self.api_key = api_key
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Create pipeline
-        self.pipeline = Pipeline([
-            ('vectorizer', TfidfVectorizer(max_features=5000, 
-                                         strip_accents='unicode',
-                                         lowercase=True,
-                                         analyzer='word',
-                                         stop_words='english')),
-            ('classifier', RandomForestClassifier(n_estimators=100, random_state=42))
-        ])
+        self._model = None
+        self._pipeline = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            # Shared per-key Gemini clients (see utils.gemini_client)
+            self._model = get_client_pool().model(self.api_key, GEMINI_MODEL)
+        return self._model
+
+    @property
+    def pipeline(self):
+        if self._pipeline is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.pipeline import Pipeline
+            from sklearn.ensemble import RandomForestClassifier
+            # Create pipeline
+            self._pipeline = Pipeline([
+                ('vectorizer', TfidfVectorizer(max_features=5000, 
+                                             strip_accents='unicode',
+                                             lowercase=True,
+                                             analyzer='word',
+                                             stop_words='english')),
+                ('classifier', RandomForestClassifier(n_estimators=100, random_state=42))
+            ])
+        return self._pipeline
 
     def _preprocess_text(self, text):
         """Preprocess text for model input"""
@@ -80,6 +90,7 @@ class CasePredictor:
             X = vectorizer.transform([text])
             X_dense = X.toarray()
             
+            import shap
             explainer = shap.TreeExplainer(classifier)
             shap_values = explainer.shap_values(X_dense)
             
@@ -124,6 +135,7 @@ class CasePredictor:
         try:
             text = ""
             with open(file_path, 'rb') as file:
+                import PyPDF2
                 pdf_reader = PyPDF2.PdfReader(file)
                 for page in pdf_reader.pages:
                     text += page.extract_text() + "\n"
@@ -135,6 +147,7 @@ class CasePredictor:
     def extract_text_from_doc(file_path):
         """Extract text from a DOC/DOCX file"""
         try:
+            import docx
             doc = docx.Document(file_path)
             text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
             return text.strip()
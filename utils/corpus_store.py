@@ -0,0 +1,290 @@
+import hashlib
+import json
+import mmap
+import os
+import zlib
+import numpy as np
+
+# On-disk layout for a corpus named <name> in <directory>:
+#   <name>.blob         concatenated UTF-8 (optionally zlib-compressed) field texts
+#   <name>.offsets.npy  int64 byte offsets into the blob, 2 * count + 1 entries;
+#                       record i's question is blob[o[2i]:o[2i+1]] and its
+#                       answer blob[o[2i+1]:o[2i+2]]
+#   <name>.hashes.npy   uint8 (count, 16) content hash of each record, in id order
+#   <name>.sources.npy  int16 source dataset of each record, an index into
+#                       meta["source_names"] (-1: unknown)
+#   <name>.meta.json    record count, compression codec and source datasets
+FIELDS = ("question", "answer")
+COMPRESSION_CODECS = ("none", "zlib")
+
+
+def _paths(directory, name):
+    base = os.path.join(directory, name)
+    return base + ".blob", base + ".offsets.npy", base + ".meta.json", base + ".hashes.npy", base + ".sources.npy"
+
+
+def corpus_exists(directory, name="corpus"):
+    """True if a complete corpus store exists in directory"""
+    return all(os.path.exists(p) for p in _paths(directory, name)[:3])
+
+
+def record_hash(question, answer):
+    """16-byte content hash identifying a question/answer record"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(question).encode("utf-8"))
+    h.update(b"\0")
+    h.update(str(answer).encode("utf-8"))
+    return h.digest()
+
+
+class _FieldView:
+    """Read-only, list-like view of one field of a CorpusStore
+
+    Lets code written against plain question/answer lists (len(), [idx],
+    iteration) read cases lazily from the store instead.
+    """
+
+    def __init__(self, store, field):
+        self._store = store
+        self._field = field
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._store.read_field(i, self._field) for i in range(*idx.indices(len(self)))]
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("corpus index out of range")
+        return self._store.read_field(idx, self._field)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._store.read_field(i, self._field)
+
+
+class CorpusStore:
+    """Memory-mapped question/answer corpus read by case id on demand
+
+    Opening a store only maps the files; case texts are read (and
+    decompressed) when requested, so a process only pays for the pages it
+    actually touches.
+    """
+
+    def __init__(self, directory, name="corpus"):
+        self.directory = directory
+        self.name = name
+        blob_path, offsets_path, meta_path, self._hashes_path, self._sources_path = _paths(directory, name)
+        self._hashes = None
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.compression = self.meta.get("compression", "none")
+        self._offsets = np.load(offsets_path, mmap_mode="r")
+
+        self._blob_file = open(blob_path, "rb")
+        if os.path.getsize(blob_path) > 0:
+            self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._blob = b""
+
+        self.questions = _FieldView(self, 0)
+        self.answers = _FieldView(self, 1)
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def __reduce__(self):
+        # Re-open from disk instead of pickling the mapped data (e.g. for worker processes)
+        return (CorpusStore, (self.directory, self.name))
+
+    def read_field(self, idx, field):
+        slot = 2 * idx + field
+        start, end = int(self._offsets[slot]), int(self._offsets[slot + 1])
+        data = self._blob[start:end]
+        if self.compression == "zlib":
+            data = zlib.decompress(data)
+        return bytes(data).decode("utf-8")
+
+    def get(self, idx):
+        """Return (question, answer) for a case id"""
+        return self.questions[idx], self.answers[idx]
+
+    @property
+    def hashes(self):
+        """Content hash of every record as bytes, in id order"""
+        if self._hashes is None:
+            if os.path.exists(self._hashes_path):
+                rows = np.load(self._hashes_path, mmap_mode="r")
+                self._hashes = [row.tobytes() for row in rows]
+            else:
+                # Stores written before hashes were recorded
+                self._hashes = [record_hash(*self.get(i)) for i in range(len(self))]
+        return self._hashes
+
+    @property
+    def sources(self):
+        """Source dataset name of every record (None if unknown), in id order"""
+        if os.path.exists(self._sources_path):
+            names = self.meta.get("source_names", [])
+            return [names[i] if i >= 0 else None for i in np.load(self._sources_path).tolist()]
+        # Stores written before sources were recorded hold full builds, grouped by source in meta order
+        counts = self.meta.get("sources") or []
+        if sum(info["count"] for info in counts) != len(self):
+            return [None] * len(self)
+        return [info["name"] for info in counts for _ in range(info["count"])]
+
+    def close(self):
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob_file.close()
+
+
+class ShardedCorpus:
+    """Several corpus stores read as one, ids running through the shards in order
+
+    Shard i holds global ids offsets[i] to offsets[i + 1] - 1. Exposes the
+    same questions / answers views as CorpusStore.
+    """
+
+    def __init__(self, stores):
+        self.stores = list(stores)
+        self.offsets = np.cumsum([0] + [len(store) for store in self.stores])
+        self.meta = self.stores[0].meta if self.stores else {}
+        self.questions = _FieldView(self, 0)
+        self.answers = _FieldView(self, 1)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def locate(self, idx):
+        """(shard number, id within the shard) for a global id"""
+        shard = int(np.searchsorted(self.offsets, idx, side="right")) - 1
+        return shard, idx - int(self.offsets[shard])
+
+    def read_field(self, idx, field):
+        shard, local = self.locate(idx)
+        return self.stores[shard].read_field(local, field)
+
+    def get(self, idx):
+        """Return (question, answer) for a global case id"""
+        return self.questions[idx], self.answers[idx]
+
+    @property
+    def hashes(self):
+        return [h for store in self.stores for h in store.hashes]
+
+    @property
+    def sources(self):
+        return [source for store in self.stores for source in store.sources]
+
+    def close(self):
+        for store in self.stores:
+            store.close()
+
+
+class CorpusWriter:
+    """Streams question/answer pairs into a corpus store
+
+    With append=True, records are added after those of an existing store
+    and keep their ids. Offsets, hashes and metadata are written under
+    temporary names and renamed into place on close(), so readers never
+    see a half-written corpus.
+    """
+
+    def __init__(self, directory, name="corpus", compression="none", append=False, meta=None):
+        if compression not in COMPRESSION_CODECS:
+            raise ValueError(f"Unknown compression '{compression}'. Choose from: {', '.join(COMPRESSION_CODECS)}")
+        self.directory = directory
+        self.name = name
+        self.compression = compression
+        self.meta = dict(meta or {})
+        self._paths = _paths(directory, name)
+        self._offsets = [0]
+        self._hashes = []
+        self._sources = []
+
+        if append and corpus_exists(directory, name):
+            existing = CorpusStore(directory, name)
+            self.compression = existing.compression
+            self.meta = {**existing.meta, **self.meta}
+            self._offsets = [int(o) for o in existing._offsets]
+            self._hashes = list(existing.hashes)
+            self._sources = existing.sources
+            existing.close()
+            # Drop any bytes left by an interrupted append, then continue after the last record
+            self._blob_path = self._paths[0]
+            self._blob = open(self._blob_path, "r+b")
+            self._blob.truncate(self._offsets[-1])
+            self._blob.seek(self._offsets[-1])
+        else:
+            self._blob_path = self._paths[0] + ".tmp"
+            self._blob = open(self._blob_path, "wb")
+        self._size = self._offsets[-1]
+
+    def _write(self, text):
+        data = str(text).encode("utf-8")
+        if self.compression == "zlib":
+            data = zlib.compress(data)
+        self._blob.write(data)
+        self._size += len(data)
+        self._offsets.append(self._size)
+
+    def add(self, question, answer, source=None):
+        """Add a record (from the named source dataset, if known) and return its id"""
+        self._write(question)
+        self._write(answer)
+        self._hashes.append(record_hash(question, answer))
+        self._sources.append(source)
+        return len(self._hashes) - 1
+
+    def close(self):
+        blob_path, offsets_path, meta_path, hashes_path, sources_path = self._paths
+        self._blob.close()
+        source_names = list(dict.fromkeys(source for source in self._sources if source is not None))
+        codes = {source: i for i, source in enumerate(source_names)}
+
+        # np.save appends .npy unless the name already ends with it
+        with open(offsets_path + ".tmp", "wb") as f:
+            np.save(f, np.array(self._offsets, dtype=np.int64))
+        with open(hashes_path + ".tmp", "wb") as f:
+            np.save(f, np.frombuffer(b"".join(self._hashes), dtype=np.uint8).reshape(-1, 16))
+        with open(sources_path + ".tmp", "wb") as f:
+            np.save(f, np.array([codes.get(source, -1) for source in self._sources], dtype=np.int16))
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                **self.meta,
+                "count": len(self._hashes),
+                "source_names": source_names,
+                "fields": list(FIELDS),
+                "compression": self.compression,
+            }, f)
+
+        if self._blob_path != blob_path:
+            os.replace(self._blob_path, blob_path)
+        # Meta last: it is what marks the corpus as complete
+        for path in (offsets_path, hashes_path, sources_path, meta_path):
+            os.replace(path + ".tmp", path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._blob.close()
+            if self._blob_path != self._paths[0]:
+                os.remove(self._blob_path)
+
+
+def write_corpus(directory, questions, answers, name="corpus", compression="none", meta=None, sources=None):
+    """Write question/answer lists (and optionally each record's source name) to a corpus store and open it"""
+    sources = sources if sources is not None else [None] * len(questions)
+    with CorpusWriter(directory, name, compression, meta=meta) as writer:
+        for question, answer, source in zip(questions, answers, sources):
+            writer.add(question, answer, source)
+    return CorpusStore(directory, name)
@@ -1,115 +1,593 @@
-from datasets import load_dataset
-from sentence_transformers import SentenceTransformer
 import faiss
 import streamlit as st
 import numpy as np
-from utils.extractors import extract_case_parts
+from utils.extractors import extract_case_parts, extract_case_parts_batch
+from utils.embedder import get_embedder, embedding_key, EMBEDDING_MODEL
+from utils.embedding_cache import EmbeddingCache, encode_with_cache, text_hash
+from utils.index_factory import (
+    build_index, apply_search_params, save_index_params, load_index_params, recall_at_k,
+    RerankedIndex, ShardedIndex, base_index, save_vectors, append_vectors, load_vectors
+)
+from utils.dedup import deduplicate_cases, minhash_signatures
+from utils.bm25 import BM25Index, MAX_DOC_CHARS
+from utils.metadata_table import MetadataTable, HEADER_CHARS
+from utils.corpus_store import CorpusStore, CorpusWriter, ShardedCorpus, corpus_exists, record_hash, write_corpus
+import hashlib
+import json
 import pickle
 import os
 import re
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Cached corpus and index files live in the parent directory of the project
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+INDEX_PATH = os.path.join(DATA_DIR, "faiss_index.index")
+INDEX_PARAMS_PATH = os.path.join(DATA_DIR, "faiss_index.params.json")
+# Full-precision float32 vectors, memory-mapped for exact re-ranking
+VECTORS_PATH = os.path.join(DATA_DIR, "embeddings.f32")
+EMBEDDING_CACHE_PATH = os.path.join(DATA_DIR, "embedding_cache.sqlite")
+DEDUP_REPORT_PATH = os.path.join(DATA_DIR, "dedup_report.json")
+BM25_DIR = os.path.join(DATA_DIR, "bm25_index")
+METADATA_DIR = os.path.join(DATA_DIR, "case_metadata")
+# INDEX_SHARDS > 1 serves the corpus from shards/shard_NNN/, each a corpus store slice with its own index
+SHARDS_DIR = os.path.join(DATA_DIR, "shards")
+SHARD_MANIFEST_PATH = os.path.join(SHARDS_DIR, "shards.json")
+
+# Rows per Arrow record batch sent to an ingestion worker
+INGEST_BATCH_SIZE = 1000
+
+DATASETS = [
+    "santoshtyss/indian_courts_cases",
+    "rishiai/indian-court-judgements-and-its-summaries",
+    "maheshCoder/indian_court_cases"
+]
+
+def _migrate_pickled_corpus(questions_path, answers_path):
+    """Convert legacy questions.pkl / answers.pkl into a corpus store (one-off)"""
+    with open(questions_path, "rb") as f:
+        questions = pickle.load(f)
+    with open(answers_path, "rb") as f:
+        answers = pickle.load(f)
+    write_corpus(DATA_DIR, questions, answers, compression=os.getenv("CORPUS_COMPRESSION", "none")).close()
+
+def _in_dir(path, directory):
+    """path's file name inside directory (e.g. a build staging or shard directory)"""
+    return os.path.join(directory, os.path.basename(path))
+
+# Shown when the app would have to ingest, embed or index itself, which it only does with ALLOW_SERVING_BUILD=1
+BUILD_HINT = "run build_index.py (or set ALLOW_SERVING_BUILD=1 to build inside the app during development)"
+
+def _serving_build_allowed():
+    """True only with ALLOW_SERVING_BUILD=1; otherwise the app only loads what build_index.py published"""
+    return os.getenv("ALLOW_SERVING_BUILD", "0") == "1"
+
+def _open_index(directory=DATA_DIR):
+    """Read the FAISS index and apply its persisted search parameters
+
+    Indexes built with rerank_oversample are wrapped so candidates are
+    re-ranked against the memory-mapped float32 vectors.
+    """
+    index_path, params_path, vectors_path = (_in_dir(p, directory) for p in (INDEX_PATH, INDEX_PARAMS_PATH, VECTORS_PATH))
+    index = faiss.read_index(index_path)
+    index_params = load_index_params(params_path)
+    if index_params.get("rerank_oversample") and os.path.exists(vectors_path):
+        index = RerankedIndex(index, load_vectors(vectors_path, index.d), index_params["rerank_oversample"])
+    apply_search_params(index, index_params)
+    return index
+
+def _is_up_to_date(corpus, index):
+    """True if the cached corpus/index match each other and the configured datasets"""
+    if index.ntotal != len(corpus):
+        return False
+    if isinstance(index, RerankedIndex) and len(index.vectors) != index.ntotal:
+        return False
+    return _sources_match(corpus)
+
+def _sources_match(corpus):
+    """True if the corpus was built for the configured DATASETS
+
+    Compares the datasets requested for the build, not those that loaded,
+    so a dataset that failed to download doesn't re-ingest everything on
+    every start.
+    """
+    if "datasets" in corpus.meta:
+        return corpus.meta["datasets"] == DATASETS
+    sources = corpus.meta.get("sources")
+    # Stores converted from the old pickles don't record their sources
+    return sources is None or [info["name"] for info in sources] == DATASETS
+
+def _num_shards():
+    return max(1, int(os.getenv("INDEX_SHARDS", "1")))
+
+def _shards_up_to_date(corpus, directory=DATA_DIR):
+    """True if shards exist for exactly this corpus and the configured shard count"""
+    manifest_path = os.path.join(_in_dir(SHARDS_DIR, directory), os.path.basename(SHARD_MANIFEST_PATH))
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest.get("num_shards") == _num_shards() and manifest.get("corpus_digest") == _corpus_digest(corpus)
+
+def _build_shards(corpus, index_type, directory=DATA_DIR):
+    """Split the corpus and its vectors into INDEX_SHARDS contiguous shards
+
+    Each shard directory gets its own corpus store, vectors file and FAISS
+    index, so shards can be served independently. Shards are written to a
+    temporary directory and swapped in when complete.
+    """
+    num_shards = _num_shards()
+    vectors_path, shards_dir = _in_dir(VECTORS_PATH, directory), _in_dir(SHARDS_DIR, directory)
+    if not os.path.exists(vectors_path) or os.path.getsize(vectors_path) % max(len(corpus), 1):
+        raise RuntimeError("sharding needs the embeddings.f32 vectors file; rebuild the index first")
+    dim = os.path.getsize(vectors_path) // 4 // max(len(corpus), 1)
+    vectors = load_vectors(vectors_path, dim)
+    bounds = np.linspace(0, len(corpus), num_shards + 1).astype(int)
+    sources = corpus.sources
+
+    tmp_dir = shards_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        shard_dir = os.path.join(tmp_dir, f"shard_{i:03d}")
+        os.makedirs(shard_dir)
+        with CorpusWriter(shard_dir, compression=corpus.compression, meta={**corpus.meta, "offset": int(start)}) as writer:
+            for idx in range(start, end):
+                writer.add(*corpus.get(idx), sources[idx])
+        shard_vectors = np.ascontiguousarray(vectors[start:end], dtype="float32")
+        index, index_params = build_index(shard_vectors, index_type)
+        save_vectors(_in_dir(VECTORS_PATH, shard_dir), shard_vectors)
+        faiss.write_index(base_index(index), _in_dir(INDEX_PATH, shard_dir))
+        save_index_params(_in_dir(INDEX_PARAMS_PATH, shard_dir), index_params)
+        print(f"Shard {i}: cases {start:,}-{end - 1:,} ({index_type})")
+
+    with open(_in_dir(SHARD_MANIFEST_PATH, tmp_dir), "w", encoding="utf-8") as f:
+        json.dump({
+            "num_shards": num_shards,
+            "offsets": bounds.tolist(),
+            "index_type": index_type,
+            "corpus_digest": _corpus_digest(corpus),
+        }, f)
+    shutil.rmtree(shards_dir, ignore_errors=True)
+    os.replace(tmp_dir, shards_dir)
+
+def _open_shards(corpus):
+    """(questions, answers, index) served from the shards, building them first if stale"""
+    if not _shards_up_to_date(corpus):
+        if not _serving_build_allowed():
+            raise RuntimeError(f"index shards are missing or stale; {BUILD_HINT}")
+        st.info(f"🧩 Splitting the index into {_num_shards()} shards...")
+        _build_shards(corpus, os.getenv("FAISS_INDEX_TYPE", "flat"))
+    shard_dirs = sorted(
+        os.path.join(SHARDS_DIR, name) for name in os.listdir(SHARDS_DIR) if name.startswith("shard_")
+    )
+    sharded = ShardedCorpus(CorpusStore(shard_dir) for shard_dir in shard_dirs)
+    index = ShardedIndex([_open_index(shard_dir) for shard_dir in shard_dirs])
+    return sharded.questions, sharded.answers, index
 
 @st.cache_resource
 def load_combined_datasets():
     """Load datasets from local files if available, otherwise from Hugging Face"""
-    # Check for cached files in the parent directory
-    parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    questions_path = os.path.join(parent_dir, "questions.pkl")
-    answers_path = os.path.join(parent_dir, "answers.pkl")
-    index_path = os.path.join(parent_dir, "faiss_index.index")
-    
+    questions_path = os.path.join(DATA_DIR, "questions.pkl")
+    answers_path = os.path.join(DATA_DIR, "answers.pkl")
+
+    if (not corpus_exists(DATA_DIR) and
+        os.path.exists(questions_path) and
+        os.path.exists(answers_path)):
+        st.info("📦 Converting pickled datasets to the memory-mapped corpus store...")
+        _migrate_pickled_corpus(questions_path, answers_path)
+
     # Try loading from local files first
-    if (os.path.exists(questions_path) and 
-        os.path.exists(answers_path) and 
-        os.path.exists(index_path)):
-        
+    if corpus_exists(DATA_DIR) and os.path.exists(INDEX_PATH):
+
         st.info("📂 Loading cached datasets from local files...")
-        
-        # Load questions and answers
-        with open(questions_path, "rb") as f:
-            questions = pickle.load(f)
-        with open(answers_path, "rb") as f:
-            answers = pickle.load(f)
-            
-        # Load FAISS index
-        index = faiss.read_index(index_path)
-        
-        # Load sentence transformer
-        embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-        
-        st.success("✅ Successfully loaded cached datasets")
-        return questions, answers, embedder, index, [{"name": "Cached Dataset", "count": len(questions)}]
-    
-    # If local files not found, load from Hugging Face
-    st.warning("⚠️ Local files not found. Loading from Hugging Face...")
-    
-    datasets = [
-        "santoshtyss/indian_courts_cases",
-        "rishiai/indian-court-judgements-and-its-summaries",
-        "maheshCoder/indian_court_cases"
-    ]
-    
-    questions, answers, info = [], [], []
-
-    for name in datasets:
-        q, a, source = load_dataset_specific(name)
+
+        # Map the corpus; case texts are only read when search returns them
+        corpus = CorpusStore(DATA_DIR)
+        info = corpus.meta.get("sources") or [{"name": "Cached Dataset", "count": len(corpus)}]
+
+        if _num_shards() > 1 and _sources_match(corpus) and _shards_up_to_date(corpus):
+            # Serve from the shards without loading the monolithic index
+            questions, answers, index = _open_shards(corpus)
+            st.success(f"✅ Successfully loaded cached datasets ({_num_shards()} shards)")
+            return questions, answers, get_embedder(), index, info
+
+        # Load FAISS index and its tuned search parameters (nprobe / efSearch / re-ranking)
+        index = _open_index()
+
+        if _is_up_to_date(corpus, index):
+            # Load sentence transformer (shared with search)
+            embedder = get_embedder()
+
+            st.success("✅ Successfully loaded cached datasets")
+            if _num_shards() > 1:
+                questions, answers, index = _open_shards(corpus)
+                return questions, answers, embedder, index, info
+            return corpus.questions, corpus.answers, embedder, index, info
+
+        if not _serving_build_allowed():
+            raise RuntimeError(f"the published index doesn't match the corpus or dataset list; {BUILD_HINT}")
+        st.warning("⚠️ Dataset list changed. Updating the index incrementally...")
+        corpus.close()
+    elif not _serving_build_allowed():
+        raise RuntimeError(f"no published index in {DATA_DIR}; {BUILD_HINT}")
+    else:
+        # If local files not found, load from Hugging Face
+        st.warning("⚠️ Local files not found. Loading from Hugging Face...")
+
+    questions, answers, sources, info = ingest_records()
+
+    st.info("🧠 Creating embeddings and building index...")
+    corpus, index = update_index(questions, answers, sources, info)
+    st.info("🏷️ Extracting case metadata for search filters...")
+    _build_metadata(corpus)
+    if os.getenv("BM25_INDEX", "1") != "0":
+        st.info("🔤 Building keyword (BM25) index...")
+        _build_bm25(corpus)
+
+    st.success("✅ Successfully loaded and cached datasets")
+    if _num_shards() > 1:
+        questions, answers, index = _open_shards(corpus)
+        return questions, answers, get_embedder(), index, info
+    # Serve from the store so the in-memory lists can be freed
+    return corpus.questions, corpus.answers, get_embedder(), index, info
+
+def ingest_records(report_path=DEDUP_REPORT_PATH):
+    """Load, parse and (unless DEDUP_CASES=0) deduplicate all DATASETS
+
+    Returns (questions, answers, sources, info): records grouped by
+    dataset in DATASETS order, each record's source name and per-source counts.
+    """
+    questions, answers, info, sources = [], [], [], []
+
+    for q, a, source in load_datasets_parallel(DATASETS):
         if q and a:
             questions.extend(q)
             answers.extend(a)
+            sources.extend([source] * len(q))
             info.append({"name": source, "count": len(q)})
-    
-    # Create embeddings and index
-    st.info("🧠 Creating embeddings and building index...")
-    embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-    embeddings = embedder.encode(questions, show_progress_bar=True)
-    
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(np.array(embeddings, dtype="float32"))
-
-    # Save files for future use
-    st.info("💾 Saving datasets for future use...")
-    with open(questions_path, "wb") as f:
-        pickle.dump(questions, f)
-    with open(answers_path, "wb") as f:
-        pickle.dump(answers, f)
-    faiss.write_index(index, index_path)
+    failed = [name for name in DATASETS if name not in {source_info["name"] for source_info in info}]
+    if failed:
+        st.warning(f"⚠️ No cases loaded from {', '.join(failed)}; rebuild the index to retry")
 
-    st.success("✅ Successfully loaded and cached datasets")
-    return questions, answers, embedder, index, info
+    if os.getenv("DEDUP_CASES", "1") != "0":
+        st.info("🧹 Removing near-duplicate cases across datasets...")
+        questions, answers, sources, info = _deduplicate(questions, answers, sources, info, report_path)
+    return questions, answers, sources, info
+
+def _deduplicate(questions, answers, sources, info, report_path=DEDUP_REPORT_PATH):
+    """Drop near-duplicate cases and write the dropped -> kept id mapping to report_path
 
-def load_dataset_specific(name):
+    Returns the canonical questions, answers, sources and per-source info.
+    """
+    cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+    embedder = get_embedder()
     try:
-        dataset = load_dataset(name, split="train")
-    except Exception as e:
-        print(f"Failed to load dataset {name}: {e}")
-        return [], [], name
+        with ProcessPoolExecutor(max_workers=int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))) as executor:
+            signatures = minhash_signatures([f"{q} {a}" for q, a in zip(questions, answers)], executor)
+        kept_ids, duplicate_of, stats = deduplicate_cases(
+            questions, answers, sources,
+            embed=lambda texts: encode_with_cache(texts, embedder, embedding_key(), cache)[0],
+            signatures=signatures,
+        )
+    finally:
+        cache.close()
+
+    # Keyed by record hash: positions in the combined input aren't stable corpus ids
+    # (incremental updates append new records at the end), but hashes are (see CorpusStore.hashes)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "stats": stats,
+            "duplicate_of": {
+                record_hash(questions[dropped], answers[dropped]).hex(): {
+                    "source": sources[dropped],
+                    "kept": record_hash(questions[kept], answers[kept]).hex(),
+                    "kept_source": sources[kept],
+                }
+                for dropped, kept in duplicate_of.items()
+            },
+        }, f)
+
+    for source_info in info:
+        source_stats = stats.get(source_info["name"], {})
+        source_info["count"] = source_stats.get("kept", source_info["count"])
+        source_info["duplicates_removed"] = source_stats.get("dropped", 0)
+    print(f"Removed {len(duplicate_of):,} near-duplicate cases: {stats}")
+
+    return ([questions[i] for i in kept_ids], [answers[i] for i in kept_ids],
+            [sources[i] for i in kept_ids], info)
 
-    cols = dataset.column_names
+def _write_index(index, index_params, directory=DATA_DIR):
+    index_path = _in_dir(INDEX_PATH, directory)
+    tmp_path = index_path + ".tmp"
+    faiss.write_index(base_index(index), tmp_path)
+    os.replace(tmp_path, index_path)
+    save_index_params(_in_dir(INDEX_PARAMS_PATH, directory), index_params)
+
+def _train_index(embeddings, index_type, vectors_path):
+    """Build an index of index_type over embeddings, recording recall and size in its params
+
+    The float32 embeddings must already be saved at vectors_path; indexes
+    with rerank_oversample are returned wrapped to re-rank against them.
+    """
+    # Index type: flat (exact), ivf_flat, hnsw, ivf_pq, sq8 or sq_fp16
+    index, index_params = build_index(embeddings, index_type)
+    if index_type != "flat":
+        index_params["recall_at_10"] = recall_at_k(index, embeddings, k=10)
+        st.info(f"📈 {index_type} index recall@10 vs flat: {index_params['recall_at_10']:.3f}")
+    if index_params.get("rerank_oversample"):
+        index = RerankedIndex(index, load_vectors(vectors_path, embeddings.shape[1]), index_params["rerank_oversample"])
+        index_params["recall_at_10_reranked"] = recall_at_k(index, embeddings, k=10)
+        index_params["index_bytes"] = int(faiss.serialize_index(base_index(index)).nbytes)
+        index_params["float32_bytes"] = int(embeddings.nbytes)
+        st.info(f"📈 Re-ranked recall@10: {index_params['recall_at_10_reranked']:.3f} "
+                f"(index {index_params['index_bytes'] / 1e6:.1f} MB vs {embeddings.nbytes / 1e6:.1f} MB float32)")
+    return index, index_params
+
+def _index_embedding_key(params_path=INDEX_PARAMS_PATH):
+    """Embedding key of the vectors in the published index (indexes from before backends: torch)"""
+    return load_index_params(params_path).get("embedding", EMBEDDING_MODEL)
+
+def _seed_cache_from_index(cache, corpus, index, key):
+    """Copy vectors of an existing exact index into the embedding cache under key
+
+    Lets the first incremental update after upgrading reuse the vectors
+    that were embedded before the cache existed. Skipped when the index was
+    built with another embedding backend.
+    """
+    if _index_embedding_key() != key:
+        return
+    if os.path.exists(VECTORS_PATH) and os.path.getsize(VECTORS_PATH) == index.ntotal * index.d * 4:
+        vectors = load_vectors(VECTORS_PATH, index.d)
+    elif isinstance(base_index(index), (faiss.IndexFlat, faiss.IndexHNSWFlat)):
+        vectors = base_index(index).reconstruct_n(0, index.ntotal)
+    else:
+        # Quantized / IVF indexes can't hand back their original vectors exactly
+        return
+    hashes = [text_hash(q) for q in corpus.questions]
+    cache.put_many(key, hashes, vectors)
+
+def update_index(questions, answers, sources, info):
+    """Bring the corpus store and FAISS index in line with the given records
+
+    Records are identified by content hash. When every cached record is
+    still present, only new records are embedded and appended to the
+    corpus store and index, so their ids stay in step. If records were
+    changed or removed, both are rebuilt in order, but embeddings of
+    unchanged texts come from the embedding cache rather than the model.
+    An index built with another embedding backend is always rebuilt, so it
+    never holds vectors of both. Returns (corpus, index).
+    """
+    embedder = get_embedder()
+    key = embedding_key()
+    cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+    compression = os.getenv("CORPUS_COMPRESSION", "none")
+    index_type = os.getenv("FAISS_INDEX_TYPE", "flat")
+    incoming = [record_hash(q, a) for q, a in zip(questions, answers)]
+
+    corpus, index = None, None
+    if corpus_exists(DATA_DIR) and os.path.exists(INDEX_PATH):
+        corpus = CorpusStore(DATA_DIR)
+        index = _open_index()
+
+    try:
+        if corpus is not None and index.ntotal == len(corpus):
+            existing = set(corpus.hashes)
+            if existing <= set(incoming) and _index_embedding_key() == key:
+                new_ids = [i for i, h in enumerate(incoming) if h not in existing]
+                vectors, num_encoded = encode_with_cache(
+                    [questions[i] for i in new_ids], embedder, key, cache, show_progress_bar=True
+                )
+                print(f"Appending {len(new_ids)} new records ({num_encoded} embedded, rest cached)")
+
+                with CorpusWriter(DATA_DIR, append=True, meta={"sources": info, "datasets": DATASETS}) as writer:
+                    for i in new_ids:
+                        writer.add(questions[i], answers[i], sources[i])
+                if new_ids:
+                    # Indexes built before the vectors file existed don't re-rank; skip it for them
+                    if os.path.exists(VECTORS_PATH):
+                        append_vectors(VECTORS_PATH, vectors, num_existing=index.ntotal)
+                    index.add(vectors)
+                index_params = load_index_params(INDEX_PARAMS_PATH) or {"index_type": index_type}
+                _write_index(index, index_params)
+
+                corpus.close()
+                # Re-open so re-ranking sees the appended vectors
+                return CorpusStore(DATA_DIR), _open_index()
+
+            _seed_cache_from_index(cache, corpus, index, key)
+
+        # Full rebuild; unchanged texts still come from the cache
+        embeddings, num_encoded = encode_with_cache(questions, embedder, key, cache, show_progress_bar=True)
+        print(f"Rebuilding index over {len(questions)} records ({num_encoded} embedded, rest cached)")
+
+        save_vectors(VECTORS_PATH, embeddings)
+        index, index_params = _train_index(embeddings, index_type, VECTORS_PATH)
+        index_params["embedding"] = key
+
+        # Save files for future use
+        st.info("💾 Saving datasets for future use...")
+        if corpus is not None:
+            corpus.close()
+        corpus = write_corpus(DATA_DIR, questions, answers, compression=compression,
+                              meta={"sources": info, "datasets": DATASETS},
+                              sources=sources)
+        _write_index(index, index_params)
+        return corpus, index
+    finally:
+        cache.close()
+
+def _corpus_digest(corpus):
+    """Digest of all record hashes, used to tell whether derived indexes are stale"""
+    return hashlib.blake2b(b"".join(corpus.hashes), digest_size=16).hexdigest()
+
+def _build_bm25(corpus, directory=DATA_DIR):
+    documents = (f"{q} {a[:MAX_DOC_CHARS]}" for q, a in zip(corpus.questions, corpus.answers))
+    bm25 = BM25Index.build(documents, meta={"corpus_digest": _corpus_digest(corpus)})
+    bm25.save(_in_dir(BM25_DIR, directory))
+    return bm25
+
+@st.cache_resource
+def load_bm25_index():
+    """Load the BM25 keyword index for hybrid search, (re)building it if it is missing or stale
+
+    Returns None when BM25_INDEX=0 or no corpus has been built yet.
+    """
+    if os.getenv("BM25_INDEX", "1") == "0" or not corpus_exists(DATA_DIR):
+        return None
+    corpus = CorpusStore(DATA_DIR)
+    if os.path.exists(os.path.join(BM25_DIR, "meta.json")):
+        bm25 = BM25Index.load(BM25_DIR)
+        if bm25.meta.get("corpus_digest") == _corpus_digest(corpus):
+            return bm25
+    if not _serving_build_allowed():
+        st.warning("⚠️ Keyword index missing or stale; hybrid retrieval is off until build_index.py is run")
+        return None
+    st.info("🔤 Building keyword (BM25) index...")
+    return _build_bm25(corpus)
+
+def _build_metadata(corpus, directory=DATA_DIR):
+    """Extract source, year and court for every corpus id and save them to METADATA_DIR
+
+    Sources come from the corpus store. Records whose source isn't known
+    (e.g. stores converted from the old pickles) are labelled "Cached Dataset".
+    """
+    sources = [source or "Cached Dataset" for source in corpus.sources]
+    texts = (f"{q} {a[:HEADER_CHARS]}" for q, a in zip(corpus.questions, corpus.answers))
+    metadata = MetadataTable.build(sources, texts, meta={"corpus_digest": _corpus_digest(corpus)})
+    metadata.save(_in_dir(METADATA_DIR, directory))
+    return metadata
+
+@st.cache_resource
+def load_metadata_table():
+    """Load per-case metadata for search filters, (re)building it if it is missing or stale
+
+    Returns None when no corpus has been built yet.
+    """
+    if not corpus_exists(DATA_DIR):
+        return None
+    corpus = CorpusStore(DATA_DIR)
+    if os.path.exists(os.path.join(METADATA_DIR, "meta.json")):
+        metadata = MetadataTable.load(METADATA_DIR)
+        if metadata.meta.get("corpus_digest") == _corpus_digest(corpus):
+            return metadata
+    if not _serving_build_allowed():
+        st.warning("⚠️ Case metadata missing or stale; search filters are off until build_index.py is run")
+        return None
+    st.info("🏷️ Extracting case metadata for search filters...")
+    return _build_metadata(corpus)
+
+def _parse_batch(name, batch):
+    """Turn one record batch (dict of column lists) into questions/answers
+
+    Runs in ingestion worker processes.
+    """
     questions, answers = [], []
+    num_rows = len(next(iter(batch.values()), []))
 
-    if name == "santoshtyss/indian_courts_cases" and "text" in cols:
-        for entry in dataset:
-            try:
-                facts, judgment = extract_case_parts(entry["text"])
-                questions.append(facts)
-                answers.append(judgment)
-            except Exception as e:
-                print(f"Skipping entry due to parsing error: {e}")
-                continue
+    if name == "santoshtyss/indian_courts_cases" and "text" in batch:
+        try:
+            parts = extract_case_parts_batch(batch["text"])
+        except Exception as e:
+            print(f"Batch parsing failed, falling back to per-entry parsing: {e}")
+            parts = []
+            for text in batch["text"]:
+                try:
+                    parts.append(extract_case_parts(text))
+                except Exception as e:
+                    print(f"Skipping entry due to parsing error: {e}")
+        for facts, judgment in parts:
+            questions.append(facts)
+            answers.append(judgment)
 
     elif name == "rishiai/indian-court-judgements-and-its-summaries":
-        for entry in dataset:
-            summary = str(entry.get("Summary", "")).strip()
-            judgment = str(entry.get("Judgment", "")).strip()
+        for summary, judgment in zip(batch.get("Summary", [""] * num_rows), batch.get("Judgment", [""] * num_rows)):
+            summary = str(summary).strip()
+            judgment = str(judgment).strip()
             if summary and judgment and len(summary) > 30 and len(judgment) > 100:
                 questions.append(summary)
                 answers.append(judgment)
 
     elif name == "maheshCoder/indian_court_cases":
-        for entry in dataset:
-            desc = entry.get("Case Description", "").strip()
-            outcome = entry.get("Case Outcome", "").strip()
+        for desc, outcome in zip(batch.get("Case Description", [""] * num_rows), batch.get("Case Outcome", [""] * num_rows)):
+            desc = (desc or "").strip()
+            outcome = (outcome or "").strip()
             if desc and outcome:
                 questions.append(desc)
                 answers.append(outcome)
 
+    return questions, answers, num_rows
+
+def _open_dataset(name):
+    """Open a dataset from LOCAL_DATASETS_DIR if saved there, otherwise from the Hub
+
+    A local copy is a directory written with Dataset.save_to_disk, named
+    after the Hub id with "/" replaced by "__".
+    """
+    # Only needed when (re)building the corpus, so not imported at startup
+    from datasets import load_dataset, load_from_disk
+    local_dir = os.getenv("LOCAL_DATASETS_DIR")
+    if local_dir:
+        local_path = os.path.join(local_dir, name.replace("/", "__"))
+        if os.path.isdir(local_path):
+            dataset = load_from_disk(local_path)
+            return dataset["train"] if hasattr(dataset, "keys") else dataset
+    return load_dataset(name, split="train")
+
+def load_dataset_specific(name, executor=None, batch_size=INGEST_BATCH_SIZE, max_pending=None):
+    """Load and parse one dataset, streaming Arrow record batches to worker processes
+
+    Batches are parsed in executor (a process pool) when given, otherwise
+    inline. Results keep the dataset's row order.
+    """
+    try:
+        dataset = _open_dataset(name)
+    except Exception as e:
+        print(f"Failed to load dataset {name}: {e}")
+        return [], [], name
+
+    questions, answers = [], []
+    pending = deque()
+    max_pending = max_pending or 2 * (os.cpu_count() or 1)
+    rows_done, start = 0, time.time()
+    last_report = start
+
+    def collect(result):
+        nonlocal rows_done, last_report
+        q, a, num_rows = result
+        questions.extend(q)
+        answers.extend(a)
+        rows_done += num_rows
+        now = time.time()
+        if now - last_report >= 5:
+            print(f"[{name}] {rows_done:,} rows ({rows_done / (now - start):,.0f} rows/sec)")
+            last_report = now
+
+    # iter() yields record batches as dicts of column lists without materialising the table in Python
+    for batch in dataset.iter(batch_size=batch_size):
+        if executor is None:
+            collect(_parse_batch(name, batch))
+            continue
+        pending.append(executor.submit(_parse_batch, name, batch))
+        # Bound memory: wait for the oldest batch once enough are in flight
+        if len(pending) >= max_pending:
+            collect(pending.popleft().result())
+    while pending:
+        collect(pending.popleft().result())
+
+    elapsed = max(time.time() - start, 1e-9)
+    print(f"[{name}] done: {rows_done:,} rows, {len(questions):,} cases in {elapsed:.1f}s "
+          f"({rows_done / elapsed:,.0f} rows/sec)")
     return questions, answers, name
+
+def load_datasets_parallel(names, num_workers=None):
+    """Load several datasets concurrently, sharing one pool of parsing processes
+
+    Returns a list of (questions, answers, name) in the order of names.
+    """
+    num_workers = num_workers or int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        with ThreadPoolExecutor(max_workers=len(names) or 1) as loaders:
+            futures = [loaders.submit(load_dataset_specific, name, executor) for name in names]
+            return [future.result() for future in futures]
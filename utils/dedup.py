@@ -0,0 +1,115 @@
+import zlib
+from collections import defaultdict
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16               # 16 bands x 4 rows: pairs above ~0.5 Jaccard usually share a bucket
+SHINGLE_SIZE = 5         # words per shingle
+MAX_WORDS = 1000         # only the start of long judgments is shingled
+JACCARD_THRESHOLD = 0.8
+EMBEDDING_THRESHOLD = 0.95   # cosine similarity of question embeddings
+MAX_CANDIDATES = 20      # earlier cases checked per case, to bound huge buckets
+
+_rng = np.random.default_rng(1234)
+# Multiply-add-shift hash family: h(x) = (a * x + b) >> 32 over uint64
+_perm_a = (_rng.integers(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)).reshape(-1, 1)
+_perm_b = _rng.integers(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64).reshape(-1, 1)
+
+
+def _shingle_hashes(text):
+    words = str(text).lower().split()[:MAX_WORDS]
+    if not words:
+        return np.zeros(1, dtype=np.uint64)
+    word_hashes = np.array([zlib.crc32(w.encode("utf-8")) for w in words], dtype=np.uint64)
+    if len(word_hashes) < SHINGLE_SIZE:
+        return word_hashes
+    # Rolling combination of SHINGLE_SIZE consecutive word hashes
+    shingles = np.zeros(len(word_hashes) - SHINGLE_SIZE + 1, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(SHINGLE_SIZE):
+            shingles = shingles * np.uint64(1000003) + word_hashes[offset:offset + len(shingles)]
+    return np.unique(shingles)
+
+
+def minhash_signature(text):
+    """NUM_PERM-value MinHash signature of a text's word shingles"""
+    shingles = _shingle_hashes(text)
+    with np.errstate(over="ignore"):
+        hashed = (_perm_a * shingles + _perm_b) >> np.uint64(32)
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def _signature_chunk(texts):
+    return np.vstack([minhash_signature(t) for t in texts])
+
+
+def minhash_signatures(texts, executor=None, chunk_size=1000):
+    """Signatures for many texts, computed in executor (e.g. a process pool) when given"""
+    if not texts:
+        return np.zeros((0, NUM_PERM), dtype=np.uint32)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    mapper = executor.map if executor is not None else map
+    return np.vstack(list(mapper(_signature_chunk, chunks)))
+
+
+def _candidate_pairs(signatures, jaccard_threshold):
+    """(later id, earlier id) pairs that share an LSH bucket and pass the Jaccard estimate"""
+    rows = NUM_PERM // BANDS
+    buckets = defaultdict(list)
+    pairs = []
+    for i, signature in enumerate(signatures):
+        candidates = set()
+        for band in range(BANDS):
+            key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            bucket = buckets[key]
+            candidates.update(bucket[-MAX_CANDIDATES:])
+            bucket.append(i)
+        for j in sorted(candidates)[:MAX_CANDIDATES]:
+            if np.mean(signatures[j] == signature) >= jaccard_threshold:
+                pairs.append((i, j))
+    return pairs
+
+
+def deduplicate_cases(questions, answers, sources, embed, jaccard_threshold=JACCARD_THRESHOLD,
+                      embedding_threshold=EMBEDDING_THRESHOLD, signatures=None):
+    """Find near-duplicate cases across the combined datasets
+
+    A case is a duplicate of an earlier one when their MinHash Jaccard
+    estimate over question + answer text passes jaccard_threshold AND the
+    cosine similarity of their question embeddings passes
+    embedding_threshold. embed(texts) must return one vector per text and
+    is only called for cases that are LSH candidates. The earliest case of
+    each group is kept, so sources listed first win.
+
+    Returns (kept_ids, duplicate_of, stats): kept ids in input order, a
+    dict of dropped id -> kept id, and per-source input/kept/dropped counts.
+    """
+    if signatures is None:
+        signatures = minhash_signatures([f"{q} {a}" for q, a in zip(questions, answers)])
+    pairs = _candidate_pairs(signatures, jaccard_threshold)
+
+    # Embedding check, embedding only the cases that appear in a candidate pair
+    involved = sorted({i for pair in pairs for i in pair})
+    vectors = {}
+    if involved:
+        embedded = np.asarray(embed([questions[i] for i in involved]), dtype="float32")
+        embedded /= np.maximum(np.linalg.norm(embedded, axis=1, keepdims=True), 1e-12)
+        vectors = dict(zip(involved, embedded))
+
+    duplicate_of = {}
+    for i, j in pairs:
+        if i in duplicate_of:
+            continue
+        if float(vectors[i] @ vectors[j]) >= embedding_threshold:
+            # Point at the kept case, following j's own duplicate link
+            duplicate_of[i] = duplicate_of.get(j, j)
+
+    kept_ids = [i for i in range(len(questions)) if i not in duplicate_of]
+
+    stats = {}
+    for i, source in enumerate(sources):
+        source_stats = stats.setdefault(source, {"input": 0, "kept": 0, "dropped": 0})
+        source_stats["input"] += 1
+        source_stats["dropped" if i in duplicate_of else "kept"] += 1
+
+    return kept_ids, duplicate_of, stats
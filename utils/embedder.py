@@ -0,0 +1,294 @@
+import json
+import os
+import platform
+import threading
+import time
+import numpy as np
+from utils.query_cache import get_query_cache, normalize_query
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# torch: the PyTorch model as published. onnx_int8: an exported ONNX graph with
+# dynamically int8-quantized weights, run by ONNX Runtime (needs optimum[onnxruntime])
+EMBEDDING_BACKENDS = ("torch", "onnx_int8")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Quantized models are exported once per model into this directory
+ONNX_MODELS_DIR = os.getenv("ONNX_MODELS_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "onnx_models"
+))
+# Corpus encoding packs length-sorted texts into batches of at most this many
+# (padded) tokens, so short texts share large batches and long ones small ones
+TOKEN_BUDGET = int(os.getenv("EMBED_TOKEN_BUDGET", "16384"))
+# A quantized model is only used if every probe sentence's embedding has at
+# least this cosine similarity to the torch model's
+MIN_QUANTIZED_COSINE = float(os.getenv("EMBEDDING_MIN_COSINE", "0.98"))
+
+PROBE_SENTENCES = [
+    "Whether the High Court was right in quashing the FIR under Section 482 CrPC.",
+    "The appellant was convicted under Section 302 IPC for murder and sentenced to life imprisonment.",
+    "Is a landlord entitled to evict a tenant for bona fide personal need?",
+    "The Supreme Court held that the arbitration clause survives termination of the contract.",
+    "Compensation for land acquired under the Land Acquisition Act, 1894.",
+    "Can an employer terminate a permanent employee without a domestic enquiry?",
+    "Writ petition challenging the cancellation of a mining lease.",
+    "Bail",
+]
+
+# Loaded models, keyed by (model name, backend). One instance per process,
+# shared by every Streamlit session and by the dataset loader.
+_embedders = {}
+_registry_lock = threading.Lock()
+
+
+def embedding_threads():
+    """CPU threads one embedder may use: EMBEDDING_THREADS, else every core
+
+    The app encodes all queries on one retrieval worker, so it gets the whole
+    machine; build_index.py gives each worker process an equal share.
+    """
+    return max(1, int(os.getenv("EMBEDDING_THREADS", "0")) or os.cpu_count() or 1)
+
+
+def _quantization_config():
+    """ONNX Runtime quantization preset for this CPU"""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        flags = ""
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    return "avx512" if "avx512f" in flags else "avx2"
+
+
+def _export_dir(model_name):
+    return os.path.join(ONNX_MODELS_DIR, model_name.replace("/", "__"))
+
+
+def _cosines(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def _export_quantized(model_name, export_dir):
+    """Export model_name to ONNX, quantize its weights to int8 and check it against torch
+
+    Writes export_dir/quantization.json with the file name and probe
+    similarities. Returns that report.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    config = _quantization_config()
+    model = SentenceTransformer(model_name, backend="onnx")
+    model.save_pretrained(export_dir)
+    export_dynamic_quantized_onnx_model(model, config, export_dir)
+    file_name = f"onnx/model_qint8_{config}.onnx"
+    if not os.path.exists(os.path.join(export_dir, file_name)):
+        # Older exporters wrote the quantized graph next to the config
+        file_name = f"model_qint8_{config}.onnx"
+
+    reference = SentenceTransformer(model_name).encode(PROBE_SENTENCES, convert_to_numpy=True)
+    quantized = SentenceTransformer(export_dir, backend="onnx", model_kwargs={"file_name": file_name})
+    cosines = _cosines(reference, quantized.encode(PROBE_SENTENCES, convert_to_numpy=True))
+    report = {
+        "model": model_name,
+        "file_name": file_name,
+        "quantization": config,
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+    }
+    with open(os.path.join(export_dir, "quantization.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Exported int8 {model_name}: probe cosine vs torch min {report['min_cosine']:.4f}, "
+          f"mean {report['mean_cosine']:.4f}")
+    return report
+
+
+def _load_torch(model_name):
+    # Deferred: importing sentence_transformers pulls in torch
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(embedding_threads())
+    embedder = SentenceTransformer(model_name)
+    embedder.eval()
+    return embedder
+
+
+def _load_onnx_int8(model_name):
+    """The int8 ONNX model, exported on first use; None if it is unavailable or too far from torch"""
+    export_dir = _export_dir(model_name)
+    report_path = os.path.join(export_dir, "quantization.json")
+    try:
+        if os.path.exists(report_path):
+            with open(report_path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+        else:
+            report = _export_quantized(model_name, export_dir)
+        if report["min_cosine"] < MIN_QUANTIZED_COSINE:
+            print(f"int8 {model_name} is below EMBEDDING_MIN_COSINE ({report['min_cosine']:.4f} < "
+                  f"{MIN_QUANTIZED_COSINE}); using the torch backend")
+            return None
+
+        import onnxruntime
+        from sentence_transformers import SentenceTransformer
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = embedding_threads()
+        session_options.inter_op_num_threads = 1
+        return SentenceTransformer(export_dir, backend="onnx", model_kwargs={
+            "file_name": report["file_name"],
+            "provider": "CPUExecutionProvider",
+            "session_options": session_options,
+        })
+    except ImportError as e:
+        print(f"EMBEDDING_BACKEND=onnx_int8 needs optimum[onnxruntime] ({str(e)}); using the torch backend. "
+              f"Install it with pip install -r requirements.txt")
+        return None
+    except Exception as e:
+        print(f"Error loading the int8 ONNX embedder, using the torch backend: {str(e)}")
+        return None
+
+
+def get_embedder(model_name=EMBEDDING_MODEL, backend=None):
+    """Return the process-wide embedder for model_name, loading it on first use
+
+    backend defaults to EMBEDDING_BACKEND. Both backends are SentenceTransformer
+    instances with the same encode() API; onnx_int8 falls back to torch when
+    it can't be loaded or fails its accuracy check.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; expected one of {', '.join(EMBEDDING_BACKENDS)}")
+    embedder = _embedders.get((model_name, backend))
+    if embedder is not None:
+        return embedder
+
+    with _registry_lock:
+        # Another session may have finished loading while we waited
+        embedder = _embedders.get((model_name, backend))
+        if embedder is None:
+            if backend == "onnx_int8":
+                embedder = _load_onnx_int8(model_name)
+            if embedder is None:
+                embedder = _embedders.get((model_name, "torch")) or _load_torch(model_name)
+                _embedders[(model_name, "torch")] = embedder
+            _embedders[(model_name, backend)] = embedder
+    return embedder
+
+
+def token_lengths(embedder, texts, chunk_size=10_000):
+    """Token count of each text as the model will see it (truncated to max_seq_length)"""
+    max_length = getattr(embedder, "max_seq_length", None) or 512
+    tokenizer = getattr(embedder, "tokenizer", None)
+    if tokenizer is None:
+        # Rough English estimate when the model doesn't expose its tokenizer
+        return np.array([min(len(t) // 4 + 2, max_length) for t in texts], dtype="int64")
+    lengths = []
+    for start in range(0, len(texts), chunk_size):
+        encoded = tokenizer(list(texts[start:start + chunk_size]), truncation=True, max_length=max_length,
+                            return_attention_mask=False, return_token_type_ids=False)
+        lengths.extend(len(ids) for ids in encoded["input_ids"])
+    return np.array(lengths, dtype="int64")
+
+
+def length_batches(lengths, token_budget=TOKEN_BUDGET, max_batch_size=256):
+    """Group text ids, longest first, into batches whose padded size fits token_budget
+
+    A batch is padded to its first (longest) text, so it holds at most
+    token_budget // that length texts (and never more than max_batch_size).
+    """
+    batches, batch = [], []
+    for i in np.argsort(-np.asarray(lengths), kind="stable"):
+        if batch and (len(batch) >= max_batch_size or (len(batch) + 1) * lengths[batch[0]] > token_budget):
+            batches.append(batch)
+            batch = []
+        batch.append(int(i))
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def encode_corpus(texts, embedder, token_budget=TOKEN_BUDGET, max_batch_size=256, show_progress_bar=False):
+    """Embed many texts of mixed length in length-bucketed, token-budgeted batches
+
+    Returns (embeddings, stats). Embeddings are float32 in the order of
+    texts. stats has the real and padded token counts and tokens_per_second
+    (real tokens only).
+    """
+    start = time.perf_counter()
+    lengths = token_lengths(embedder, texts)
+    batches = length_batches(lengths, token_budget, max_batch_size)
+    if show_progress_bar:
+        from tqdm import tqdm
+        batches = tqdm(batches, desc="Embedding", unit="batch")
+
+    embeddings = None
+    padded_tokens = 0
+    for batch in batches:
+        vectors = embedder.encode([texts[i] for i in batch], batch_size=len(batch), convert_to_numpy=True)
+        if embeddings is None:
+            embeddings = np.empty((len(texts), vectors.shape[1]), dtype="float32")
+        # Written back by id, so the output is in input order
+        embeddings[batch] = vectors
+        padded_tokens += len(batch) * int(lengths[batch[0]])
+    if embeddings is None:
+        embeddings = np.zeros((0, embedder.get_sentence_embedding_dimension()), dtype="float32")
+
+    seconds = time.perf_counter() - start
+    tokens = int(lengths.sum())
+    return embeddings, {
+        "texts": len(texts),
+        "tokens": tokens,
+        "padded_tokens": padded_tokens,
+        "seconds": round(seconds, 3),
+        "tokens_per_second": round(tokens / seconds, 1) if seconds else 0.0,
+    }
+
+
+def embedding_key(model_name=EMBEDDING_MODEL, backend=None):
+    """Key under which vectors of model_name's embedder are cached (loads the embedder)
+
+    Vectors from different backends are close but not identical, so each
+    backend actually in use gets its own key, "<model>@<backend>". An
+    onnx_int8 embedder that fell back to torch gets the torch key. Torch
+    keeps the bare model name, so caches written before backends existed
+    stay valid.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    embedder = get_embedder(model_name, backend)
+    if embedder is _embedders.get((model_name, "torch")):
+        return model_name
+    return f"{model_name}@{backend}"
+
+
+def clear_embedders():
+    """Drop all loaded models (mainly for freeing memory in long-running jobs)"""
+    with _registry_lock:
+        _embedders.clear()
+
+
+def encode_queries(queries, model_name=EMBEDDING_MODEL, batch_size=64):
+    """Embed search queries, skipping the model for queries already in the query cache
+
+    Returns a float32 matrix with one row per query.
+    """
+    cache = get_query_cache()
+    key = embedding_key(model_name)
+    vectors = [cache.get(key, q) for q in queries]
+
+    # Encode each distinct missing query once, in a single batch
+    missing = {}
+    for i, vector in enumerate(vectors):
+        if vector is None:
+            missing.setdefault(normalize_query(queries[i]), []).append(i)
+    if missing:
+        embedder = get_embedder(model_name)
+        texts = [queries[rows[0]] for rows in missing.values()]
+        new_vectors = embedder.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        for text, rows, vector in zip(texts, missing.values(), new_vectors):
+            cache.put(key, text, vector)
+            for i in rows:
+                vectors[i] = vector
+
+    return np.ascontiguousarray(np.vstack(vectors), dtype="float32")
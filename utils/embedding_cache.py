@@ -0,0 +1,105 @@
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from utils.embedder import encode_corpus
+
+
+def text_hash(text):
+    """16-byte content hash used to key cached embeddings"""
+    return hashlib.blake2b(str(text).encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by (model key, text hash), stored in SQLite
+
+    The model key names the backend too (see embedder.embedding_key), so
+    vectors of the torch and int8 ONNX backends are never mixed.
+
+    Vectors are stored as raw float32 bytes, so re-ingesting a corpus only
+    has to run the model on texts it has never seen before.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self._lock = threading.Lock()
+        # timeout: how long a write waits for another process (e.g. a build worker) to commit
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " hash BLOB NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model_name, hashes, chunk_size=500):
+        """Return {hash: vector} for the hashes that are cached"""
+        found = {}
+        hashes = list(set(hashes))
+        with self._lock:
+            for start in range(0, len(hashes), chunk_size):
+                chunk = hashes[start:start + chunk_size]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model_name, *chunk],
+                )
+                for h, vector in rows:
+                    found[bytes(h)] = np.frombuffer(vector, dtype="float32")
+        return found
+
+    def put_many(self, model_name, hashes, vectors):
+        vectors = np.asarray(vectors, dtype="float32")
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(model_name, h, v.tobytes()) for h, v in zip(hashes, vectors)],
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def encode_with_cache(texts, embedder, model_name, cache, batch_size=256, show_progress_bar=False):
+    """Embed texts, running the model only on texts missing from the cache
+
+    model_name is the cache key of embedder's vectors (embedder.embedding_key()).
+
+    Missing texts are encoded in length-bucketed batches (see
+    encode_corpus) of at most batch_size texts. Returns (embeddings,
+    num_encoded) with embeddings in the order of texts.
+    """
+    hashes = [text_hash(t) for t in texts]
+    cached = cache.get_many(model_name, hashes)
+
+    # Encode each missing text once, even if it appears several times
+    missing = {}
+    for i, h in enumerate(hashes):
+        if h not in cached and h not in missing:
+            missing[h] = i
+    if missing:
+        new_vectors, stats = encode_corpus(
+            [texts[i] for i in missing.values()],
+            embedder,
+            max_batch_size=batch_size,
+            show_progress_bar=show_progress_bar,
+        )
+        if len(missing) >= 1000:
+            print(f"Embedded {stats['texts']:,} texts ({stats['tokens']:,} tokens) at "
+                  f"{stats['tokens_per_second']:,.0f} tokens/s, "
+                  f"{stats['tokens'] / max(stats['padded_tokens'], 1):.0%} of batch tokens not padding")
+        cache.put_many(model_name, list(missing), new_vectors)
+        cached.update(zip(missing, new_vectors))
+
+    if not texts:
+        return np.zeros((0, embedder.get_sentence_embedding_dimension()), dtype="float32"), 0
+    return np.vstack([cached[h] for h in hashes]).astype("float32"), len(missing)
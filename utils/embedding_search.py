@@ -1,36 +1,320 @@
+import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from utils.embedder import encode_queries, get_embedder
+from utils.bm25 import MAX_DOC_CHARS, reciprocal_rank_fusion
+from utils.index_factory import RerankedIndex, ShardedIndex, base_index
+from utils.metadata_table import id_selector
 
-def get_embedder():
-    """Get the sentence transformer model for embeddings"""
-    return SentenceTransformer('all-MiniLM-L6-v2')
+RETRIEVAL_MODES = ("dense", "hybrid")
 
-def search_similar_cases(query, index, questions, answers, k=5):
-    """Search for similar cases using FAISS index"""
+# Hybrid mode fuses this many times k candidates from each retriever
+HYBRID_CANDIDATE_FACTOR = 4
+
+# Long-document queries: passage length (MiniLM truncates at 256 tokens, roughly 1000 characters),
+# passages embedded per document, and how per-passage hits are combined per case
+PASSAGE_CHARS = 1000
+MAX_PASSAGES = 64
+PASSAGE_AGGREGATIONS = ("max", "sum")
+
+# Filters selecting at most this many cases are searched by brute force over just those vectors
+SMALL_FILTER_SIZE = 20000
+
+def _to_results(distances, indices, questions, answers):
+    """Convert one row of FAISS distances/ids into result dicts"""
+    # Convert distances to similarity scores between 0 and 100%
+    # Using similarity = 1 / (1 + distance)
+    results = []
+    for dist, idx in zip(distances, indices):
+        if idx < 0:
+            # FAISS pads with -1 when fewer than k vectors are available
+            continue
+        similarity = 1 / (1 + dist)  # similarity between 0 and 1
+        similarity_percent = similarity * 100
+        results.append({
+            'question': questions[idx],
+            'answer': answers[idx],
+            'similarity': similarity_percent
+        })
+    return results
+
+def _stored_vectors(index, ids):
+    """Vectors of indexed cases from the index or its vectors file, or None if unavailable"""
+    if isinstance(index, RerankedIndex):
+        return np.asarray(index.vectors[np.asarray(ids)], dtype="float32")
+    try:
+        return index.reconstruct_batch(np.asarray(ids, dtype="int64"))
+    except (RuntimeError, AttributeError):
+        # e.g. IVF indexes without a direct map
+        return None
+
+def _doc_vectors(index, ids, questions):
+    """Vectors of indexed cases, re-embedding their questions as a last resort"""
+    vectors = _stored_vectors(index, ids)
+    if vectors is None:
+        vectors = get_embedder().encode([questions[i] for i in ids], convert_to_numpy=True).astype("float32")
+    return vectors
+
+def _search_params(index, selector):
+    """Index-appropriate faiss SearchParameters carrying an ID selector"""
+    inner = base_index(index)
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if hasattr(inner, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+def _search(index, query_embeddings, k, mask=None):
+    """index.search, optionally restricted to the ids where mask is True
+
+    Small selections are brute-forced over just the selected vectors, so
+    tighter filters cost less. Larger ones pass an IDSelectorBitmap into
+    the FAISS search itself rather than over-fetching and post-filtering.
+    """
+    if isinstance(index, ShardedIndex):
+        # Each shard applies its own slice of the mask, in parallel
+        return index.search(query_embeddings, k, mask=mask, shard_search=_search)
+
+    if mask is None:
+        return index.search(query_embeddings, k)
+
+    selected = np.flatnonzero(mask)
+    if len(selected) == 0:
+        return (np.full((len(query_embeddings), k), np.inf, dtype="float32"),
+                np.full((len(query_embeddings), k), -1, dtype="int64"))
+
+    if len(selected) <= SMALL_FILTER_SIZE:
+        vectors = _stored_vectors(index, selected)
+        if vectors is not None:
+            D, I = faiss.knn(query_embeddings, np.ascontiguousarray(vectors), min(k, len(selected)))
+            ids = np.where(I >= 0, selected[np.maximum(I, 0)], -1)
+            if ids.shape[1] < k:
+                pad = k - ids.shape[1]
+                D = np.pad(D, ((0, 0), (0, pad)), constant_values=np.inf)
+                ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+            return D, ids
+
+    # The bitmap must stay referenced while faiss uses the selector
+    selector, bitmap = id_selector(mask)
+    return index.search(query_embeddings, k, params=_search_params(index, selector))
+
+def _hybrid_candidates(k):
+    """Candidates taken from each retriever for a hybrid top-k"""
+    return max(k * HYBRID_CANDIDATE_FACTOR, 20)
+
+def _fuse_hybrid(query, query_embedding, dense_ids, index, questions, bm25, k, mask=None):
+    """Fuse a dense ranking (ids, best first) with BM25's by reciprocal rank fusion
+
+    Returns (distances, ids) for the fused top-k, with exact embedding
+    distances so similarity scores stay comparable with dense mode.
+    """
+    bm25_ids, _ = bm25.search(query, _hybrid_candidates(k), mask=mask)
+
+    fused_ids = [doc_id for doc_id, _ in reciprocal_rank_fusion([dense_ids, bm25_ids], k=k)]
+    if not fused_ids:
+        return np.zeros(0, dtype="float32"), np.zeros(0, dtype="int64")
+    vectors = _doc_vectors(index, fused_ids, questions)
+    distances = ((vectors - query_embedding[0]) ** 2).sum(axis=1)
+    return distances, np.array(fused_ids, dtype="int64")
+
+def _hybrid_search(query, query_embedding, index, questions, bm25, k, mask=None):
+    """Dense search for the hybrid candidates, fused with BM25 (see _fuse_hybrid)"""
+    _, dense_ids = _search(index, query_embedding, _hybrid_candidates(k), mask)
+    return _fuse_hybrid(query, query_embedding, dense_ids[0], index, questions, bm25, k, mask)
+
+def _check_mode(mode):
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {', '.join(RETRIEVAL_MODES)}")
+
+def _filter_mask(filters, metadata):
+    if not filters or metadata is None:
+        return None
+    return metadata.mask(**filters)
+
+def search_with_embedding(query, query_embedding, index, questions, answers, k=5, mode="dense", bm25=None, mask=None):
+    """search_similar_cases for an already-embedded query (a 1 x d float32 matrix)"""
+    _check_mode(mode)
+    if mode == "hybrid" and bm25 is not None:
+        distances, ids = _hybrid_search(query, query_embedding, index, questions, bm25, k, mask)
+        return _to_results(distances, ids, questions, answers)
+
+    # Search in FAISS index
+    D, I = _search(index, query_embedding, k, mask)
+    return _to_results(D[0], I[0], questions, answers)
+
+def _dense_k(k, mode, bm25):
+    """Dense results a search needs: its k, or its hybrid candidates"""
+    return _hybrid_candidates(k) if mode == "hybrid" and bm25 is not None else k
+
+def search_many_with_embeddings(searches, query_embeddings, index, questions, answers):
+    """search_with_embedding for many already-embedded queries at once
+
+    searches is a list of dicts with the search_similar_cases arguments
+    "query", "k", "mode", "bm25", "filters" and "metadata", one per row of
+    query_embeddings. All unfiltered queries, dense and hybrid, share one
+    FAISS search at the largest depth any of them needs; each hybrid query's
+    dense candidates are then fused with BM25. Filtered queries are searched
+    one by one, as each has its own filter. Returns one entry per search:
+    its result list, or the exception its search raised, so one failing
+    query doesn't fail the others.
+    """
+    outcomes = [None] * len(searches)
+    plain, other = [], []
+    for row, search in enumerate(searches):
+        try:
+            _check_mode(search["mode"])
+            mask = _filter_mask(search["filters"], search["metadata"])
+        except Exception as e:
+            outcomes[row] = e
+            continue
+        if mask is None:
+            plain.append(row)
+        else:
+            other.append((row, mask))
+
+    if plain:
+        # One search at the largest depth, truncated per query
+        dense_ks = {row: _dense_k(searches[row]["k"], searches[row]["mode"], searches[row]["bm25"]) for row in plain}
+        D, I = _search(index, query_embeddings[plain], max(dense_ks.values()))
+        for i, row in enumerate(plain):
+            search = searches[row]
+            try:
+                if search["mode"] == "hybrid" and search["bm25"] is not None:
+                    distances, ids = _fuse_hybrid(
+                        search["query"], query_embeddings[row:row + 1], I[i, :dense_ks[row]], index, questions,
+                        search["bm25"], search["k"],
+                    )
+                else:
+                    distances, ids = D[i, :search["k"]], I[i, :search["k"]]
+                outcomes[row] = _to_results(distances, ids, questions, answers)
+            except Exception as e:
+                outcomes[row] = e
+
+    for row, mask in other:
+        search = searches[row]
+        try:
+            outcomes[row] = search_with_embedding(
+                search["query"], query_embeddings[row:row + 1], index, questions, answers,
+                search["k"], search["mode"], search["bm25"], mask,
+            )
+        except Exception as e:
+            outcomes[row] = e
+    return outcomes
+
+def search_similar_cases(query, index, questions, answers, k=5, mode="dense", bm25=None,
+                         filters=None, metadata=None):
+    """Search for similar cases using FAISS index
+
+    mode="hybrid" fuses the FAISS ranking with BM25 keyword scores from
+    bm25 (a BM25Index over the same corpus ids), which helps queries that
+    hinge on statute sections, case numbers or party names.
+
+    filters (e.g. {"sources": [...], "year_range": (2000, 2010), "courts": [...]})
+    restrict the search to matching cases in metadata (a MetadataTable).
+    """
+    _check_mode(mode)
     try:
-        # Get embedder
-        embedder = get_embedder()
-        
-        # Get query embedding
-        query_embedding = embedder.encode([query], convert_to_tensor=True).cpu().numpy()
-        
-        # Search in FAISS index
-        D, I = index.search(query_embedding, k)
-        
-        # Convert distances to similarity scores between 0 and 100%
-        # Using similarity = 1 / (1 + distance)
-        results = []
-        for dist, idx in zip(D[0], I[0]):
-            similarity = 1 / (1 + dist)  # similarity between 0 and 1
-            similarity_percent = similarity * 100
-            results.append({
-                'question': questions[idx],
-                'answer': answers[idx],
-                'similarity': similarity_percent
-            })
-            
-        return results
-        
+        # Get query embedding (served from the query cache for repeat queries)
+        query_embedding = encode_queries([query])
+        return search_with_embedding(query, query_embedding, index, questions, answers, k, mode, bm25,
+                                     _filter_mask(filters, metadata))
+
     except Exception as e:
         print(f"Error in search_similar_cases: {str(e)}")
         return []
+
+def search_similar_cases_batch(queries, index, questions, answers, k=5, batch_size=64,
+                               filters=None, metadata=None):
+    """Search for similar cases for many queries with one encode and one FAISS search
+
+    Returns one result list per query, in the same format as search_similar_cases.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+
+    try:
+        # One forward pass over all uncached queries (batched internally by the model)
+        query_embeddings = encode_queries(queries, batch_size=batch_size)
+
+        # One FAISS search over the whole query matrix
+        D, I = _search(index, query_embeddings, k, _filter_mask(filters, metadata))
+
+        return [_to_results(D[row], I[row], questions, answers) for row in range(len(queries))]
+
+    except Exception as e:
+        print(f"Error in search_similar_cases_batch: {str(e)}")
+        return [[] for _ in queries]
+
+def split_passages(text, passage_chars=PASSAGE_CHARS, max_passages=MAX_PASSAGES):
+    """Split a document into whitespace-aligned passages of about passage_chars characters
+
+    Documents with more than max_passages passages are sampled evenly, so
+    the whole document is still covered.
+    """
+    passages, current, length = [], [], 0
+    for word in str(text).split():
+        if current and length + len(word) + 1 > passage_chars:
+            passages.append(" ".join(current))
+            current, length = [], 0
+        current.append(word)
+        length += len(word) + 1
+    if current:
+        passages.append(" ".join(current))
+    if len(passages) > max_passages:
+        keep = np.linspace(0, len(passages) - 1, max_passages).round().astype(int)
+        passages = [passages[i] for i in keep]
+    return passages
+
+def search_similar_cases_long(document, index, questions, answers, k=5, aggregation="max",
+                              mode="dense", bm25=None, filters=None, metadata=None,
+                              passage_chars=PASSAGE_CHARS, max_passages=MAX_PASSAGES, batch_size=64):
+    """Search for cases similar to a long document using all of its passages
+
+    The passages are embedded in one batch and searched with one FAISS call.
+    Per-passage hits are combined per case: "max" ranks by the best passage
+    similarity, "sum" adds up similarities across passages, which favours cases
+    that match many parts of the document. In hybrid mode the combined ranking is fused
+    with BM25 over the start of the document. Returns results in the same
+    format as search_similar_cases. A case's similarity is that of its closest passage.
+    """
+    _check_mode(mode)
+    if aggregation not in PASSAGE_AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation {aggregation!r}; expected one of {', '.join(PASSAGE_AGGREGATIONS)}")
+    try:
+        passages = split_passages(document, passage_chars, max_passages)
+        if not passages:
+            return []
+
+        # Passages are one-off texts, so they bypass the query cache
+        passage_embeddings = np.ascontiguousarray(
+            get_embedder().encode(passages, batch_size=batch_size, convert_to_numpy=True), dtype="float32"
+        )
+        num_candidates = _hybrid_candidates(k)
+        D, I = _search(index, passage_embeddings, num_candidates, _filter_mask(filters, metadata))
+
+        valid = I >= 0
+        ids, similarities = I[valid], 1 / (1 + D[valid])
+        if len(ids) == 0:
+            return []
+        case_ids, inverse = np.unique(ids, return_inverse=True)
+        if aggregation == "sum":
+            scores = np.bincount(inverse, weights=similarities)
+        else:
+            scores = np.full(len(case_ids), -np.inf)
+            np.maximum.at(scores, inverse, similarities)
+        ranked = case_ids[np.argsort(-scores, kind="stable")]
+
+        if mode == "hybrid" and bm25 is not None:
+            bm25_ids, _ = bm25.search(document[:MAX_DOC_CHARS], num_candidates, mask=_filter_mask(filters, metadata))
+            ranked = [doc_id for doc_id, _ in reciprocal_rank_fusion([ranked, bm25_ids], k=k)]
+        ranked = np.asarray(ranked[:k], dtype="int64")
+
+        # Distance to the closest passage, so similarity scores stay comparable with single queries
+        vectors = _doc_vectors(index, ranked, questions)
+        distances = faiss.pairwise_distances(vectors, passage_embeddings).min(axis=1)
+        return _to_results(distances, ranked, questions, answers)
+
+    except Exception as e:
+        print(f"Error in search_similar_cases_long: {str(e)}")
+        return []
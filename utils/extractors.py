@@ -1,19 +1,39 @@
 import re
 
+# Section headings that mark where the facts end, in priority order
+SPLIT_PATTERNS = [
+    r'(judgment|held|decision|ruling|court.?held|it.?held)[:.]',
+    r'(facts|background|case.*?facts)[:.]',
+    r'(analysis|reasoning|legal.*?analysis)[:.]',
+    r'(conclusion|outcome|result)[:.]'
+]
+
+MIN_PART_LENGTH = 50
+
+# Compiled once at import instead of on every call
+_compiled_patterns = [re.compile(p, re.IGNORECASE) for p in SPLIT_PATTERNS]
+
+
 def extract_case_parts(text):
+    """Split a judgment into (facts, judgment) at the first usable section heading
+
+    Headings are tried in SPLIT_PATTERNS priority order, and each pattern's
+    scan stops at its first match. That match is used if it leaves more
+    than 50 characters on both sides. Falls back to a 3/5 split.
+    """
     text = str(text).strip()
-    split_patterns = [
-        r'(?i)(judgment|held|decision|ruling|court.?held|it.?held)[:.]',
-        r'(?i)(facts|background|case.*?facts)[:.]',
-        r'(?i)(analysis|reasoning|legal.*?analysis)[:.]',
-        r'(?i)(conclusion|outcome|result)[:.]'
-    ]
-    for pattern in split_patterns:
-        matches = list(re.finditer(pattern, text))
-        if matches:
-            split_point = matches[0].start()
+    for pattern in _compiled_patterns:
+        match = pattern.search(text)
+        if match:
+            split_point = match.start()
             facts, judgment = text[:split_point].strip(), text[split_point:].strip()
-            if len(facts) > 50 and len(judgment) > 50:
+            if len(facts) > MIN_PART_LENGTH and len(judgment) > MIN_PART_LENGTH:
                 return facts, judgment
     split_point = len(text) * 3 // 5
     return text[:split_point].strip(), text[split_point:].strip()
+
+
+def extract_case_parts_batch(texts):
+    """Split a list of judgments into (facts, judgment) pairs, in order"""
+    split = extract_case_parts
+    return [split(text) for text in texts]
@@ -0,0 +1,196 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from utils.rate_limiter import backoff_delay, get_rate_limiter, is_retryable
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+# Clients (each with its own connection) kept per API key; requests rotate over them
+CLIENTS_PER_KEY = int(os.getenv("GEMINI_CLIENTS_PER_KEY", "4"))
+# API keys with live clients; the least recently used key's clients are dropped beyond this
+MAX_KEYS = int(os.getenv("GEMINI_MAX_KEYS", "32"))
+# Each request, including waiting for the rate limiter and retries, fails after this long
+DEADLINE_S = float(os.getenv("GEMINI_DEADLINE_S", "60"))
+# Alternative API endpoint, e.g. http://127.0.0.1:8765 for fake_gemini_server.py (uses the REST transport)
+API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+
+def _model_path(model_name):
+    return model_name if model_name.startswith("models/") else f"models/{model_name}"
+
+
+class GeminiModel:
+    """GenerativeModel-like handle: a model name bound to one API key
+
+    generate_content() goes through the shared client pool, so handles are
+    cheap to create and safe to use from any thread or session.
+    """
+
+    def __init__(self, pool, api_key, model_name=DEFAULT_MODEL):
+        self._pool = pool
+        self.api_key = api_key
+        self.model_name = model_name
+
+    def generate_content(self, prompt):
+        return self._pool.generate_content(self.api_key, self.model_name, prompt)
+
+    def stream_text(self, prompt):
+        return self._pool.stream_text(prompt, self.api_key, self.model_name)
+
+
+class GeminiClientPool:
+    """Reusable Gemini API clients, per API key
+
+    Unlike genai.configure(), which sets one process-wide key, every
+    request here is sent with its own key. Each key gets up to
+    clients_per_key clients, created on first use and kept open so their
+    connections are reused. Clients are thread-safe and handed out in turn.
+
+    Requests wait for their key's rate limiter (see utils.rate_limiter) and
+    retry rate-limit and server errors with jittered exponential backoff,
+    all within deadline_s seconds.
+    """
+
+    def __init__(self, clients_per_key=CLIENTS_PER_KEY, max_keys=MAX_KEYS, deadline_s=DEADLINE_S,
+                 api_endpoint=API_ENDPOINT):
+        self.clients_per_key = max(1, clients_per_key)
+        self.max_keys = max(1, max_keys)
+        self.deadline_s = deadline_s
+        self.api_endpoint = api_endpoint
+        self._clients = OrderedDict()   # api key -> (clients, round-robin counter)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "failures": 0, "throttled_seconds": 0.0}
+
+    def _client(self, api_key):
+        with self._lock:
+            entry = self._clients.get(api_key)
+            if entry is None:
+                entry = self._clients[api_key] = ([], itertools.count())
+                while len(self._clients) > self.max_keys:
+                    # Not closed here: another thread may still be mid-request on one of them.
+                    # Their channels close when the last reference goes.
+                    self._clients.popitem(last=False)
+            self._clients.move_to_end(api_key)
+            clients, turn = entry
+            if len(clients) < self.clients_per_key:
+                # Imported here so pages that never call Gemini don't pay for loading the SDK
+                from google.ai import generativelanguage as glm
+                if self.api_endpoint:
+                    client = glm.GenerativeServiceClient(
+                        client_options={"api_key": api_key, "api_endpoint": self.api_endpoint}, transport="rest"
+                    )
+                else:
+                    client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+                clients.append(client)
+                return client
+            return clients[next(turn) % len(clients)]
+
+    def model(self, api_key, model_name=DEFAULT_MODEL):
+        return GeminiModel(self, api_key, model_name)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _call(self, api_key, send):
+        """Run send(client, timeout) under api_key's rate limit, retrying retryable errors until the deadline"""
+        deadline = time.monotonic() + self.deadline_s
+        limiter = get_rate_limiter(api_key)
+        self._count("requests")
+        for attempt in itertools.count():
+            if limiter is not None:
+                waited = time.monotonic()
+                if not limiter.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                    self._count("failures")
+                    raise TimeoutError(f"Gemini rate limit: no request slot within the {self.deadline_s:.0f}s deadline")
+                self._count("throttled_seconds", time.monotonic() - waited)
+            try:
+                # The per-attempt timeout is whatever is left of the deadline
+                return send(self._client(api_key), max(0.1, deadline - time.monotonic()))
+            except Exception as e:
+                delay = backoff_delay(attempt)
+                if not is_retryable(e) or time.monotonic() + delay >= deadline:
+                    self._count("failures")
+                    raise
+                print(f"Gemini request failed ({str(e)[:200]}); retry {attempt + 1} in {delay:.1f}s")
+                self._count("retries")
+                time.sleep(delay)
+
+    @staticmethod
+    def _request(model_name, prompt):
+        from google.ai import generativelanguage as glm
+        return glm.GenerateContentRequest(
+            model=_model_path(model_name),
+            contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+        )
+
+    def generate_content(self, api_key, model_name, prompt):
+        """Send one prompt; returns a google.generativeai GenerateContentResponse (with .text)"""
+        from google.generativeai.types import GenerateContentResponse
+        request = self._request(model_name, prompt)
+        # retry=None: retries are done by _call, under the rate limiter and deadline
+        response = self._call(
+            api_key, lambda client, timeout: client.generate_content(request=request, timeout=timeout, retry=None)
+        )
+        return GenerateContentResponse.from_response(response)
+
+    def generate_text(self, prompt, api_key, model_name=DEFAULT_MODEL):
+        return self.generate_content(api_key, model_name, prompt).text.strip()
+
+    def stream_text(self, prompt, api_key, model_name=DEFAULT_MODEL):
+        """Yield the response text in pieces as the model generates it
+
+        The request is sent when iteration starts. Joining the pieces gives
+        the same text as generate_text (apart from stripping). It is retried
+        like generate_content until the first piece arrives, but not after,
+        since the caller may already have shown part of the response.
+        """
+        request = self._request(model_name, prompt)
+
+        def open_stream(client, timeout):
+            chunks = iter(client.stream_generate_content(request=request, timeout=timeout, retry=None))
+            # Errors such as rate limiting surface on the first chunk
+            return chunks, next(chunks, None)
+
+        chunks, first = self._call(api_key, open_stream)
+        for chunk in itertools.chain([first] if first is not None else [], chunks):
+            # The last chunk may carry only the finish reason, with no text parts
+            text = "".join(part.text for candidate in chunk.candidates[:1] for part in candidate.content.parts)
+            if text:
+                yield text
+
+    def close(self):
+        with self._lock:
+            for clients, _ in self._clients.values():
+                for client in clients:
+                    client.transport.close()
+            self._clients.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool():
+    """Process-wide Gemini client pool, shared by every session"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = GeminiClientPool()
+    return _pool
+
+
+def generate_text(prompt, api_key, model_name=DEFAULT_MODEL):
+    """Generate a response to prompt with api_key through the shared pool; returns the stripped text"""
+    return get_client_pool().generate_text(prompt, api_key, model_name)
+
+
+def stream_text(prompt, api_key, model_name=DEFAULT_MODEL):
+    """Like generate_text, but yields text pieces as they are generated (e.g. for st.write_stream)"""
+    return get_client_pool().stream_text(prompt, api_key, model_name)
@@ -1,7 +1,9 @@
-import google.generativeai as genai
+from utils.gemini_client import DEFAULT_MODEL as GEMINI_MODEL, generate_text, stream_text
+
+# Bump when the summary prompt changes, so cached summaries are regenerated
+SUMMARY_PROMPT_VERSION = "1"
 
 def generate_case_summary(facts, judgment, api_key):
-    genai.configure(api_key=api_key)
     prompt = f"""
 You are a legal expert. Analyze this case and provide a structured summary with specific details.
 
@@ -37,12 +39,10 @@ Format your response in clean markdown as follows:
 
 Ensure all sections are filled appropriately based on the case content.
 """
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    # Shared, per-key clients: no process-wide genai.configure() that concurrent sessions could overwrite
+    return generate_text(prompt, api_key, GEMINI_MODEL)
 
-def generate_answer(query, similar_cases, api_key):
-    genai.configure(api_key=api_key)
+def _answer_prompt(query, similar_cases):
     context = ""
     for i, case in enumerate(similar_cases, 1):
         context += f"**Case {i} Facts:**\n{case['question']}\n\n**Case {i} Judgment:**\n{case['answer']}\n\n---\n\n"
@@ -77,9 +77,21 @@ Provide a comprehensive legal analysis in markdown format with the following str
 
 Format your response clearly with proper headings and bullet points where appropriate.
 """
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return prompt
+
+def generate_answer(query, similar_cases, api_key):
+    return generate_text(_answer_prompt(query, similar_cases), api_key, GEMINI_MODEL)
+
+def stream_answer(query, similar_cases, api_key):
+    """generate_answer as an iterator of text pieces, for rendering while it is generated
+
+    Like the other streams, a failure is yielded as text rather than raised,
+    so the page can still show the case summaries.
+    """
+    try:
+        yield from stream_text(_answer_prompt(query, similar_cases), api_key, GEMINI_MODEL)
+    except Exception as e:
+        yield f"\n\n❌ Error generating analysis: {str(e)}"
 
 # Usage in Streamlit
 def display_case_summary_markdown(markdown_text):
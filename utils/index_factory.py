@@ -0,0 +1,367 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq", "sq8", "sq_fp16")
+
+# rerank_oversample: fetch k * oversample candidates from the compressed
+# index and re-rank them exactly against the float32 vectors file
+DEFAULT_INDEX_PARAMS = {
+    "flat": {},
+    "ivf_flat": {"nlist": None, "nprobe": 16},
+    "hnsw": {"M": 32, "efConstruction": 200, "efSearch": 64},
+    "ivf_pq": {"nlist": None, "m": None, "nbits": 8, "nprobe": 16},
+    "sq8": {"rerank_oversample": 4},
+    "sq_fp16": {"rerank_oversample": 4},
+}
+
+_SCALAR_QUANTIZERS = {
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+    "sq_fp16": faiss.ScalarQuantizer.QT_fp16,
+}
+
+# Max number of vectors used to train IVF / PQ quantizers
+DEFAULT_TRAIN_SIZE = 100_000
+
+
+def _default_nlist(n):
+    """Rule of thumb: ~4*sqrt(n) lists, with at least 39 training points per list"""
+    return max(1, min(int(4 * np.sqrt(n)), n // 39))
+
+
+def _default_pq_m(d):
+    """Largest number of sub-quantizers <= d/8 that divides d"""
+    for m in range(max(1, d // 8), 0, -1):
+        if d % m == 0:
+            return m
+    return 1
+
+
+def _training_sample(embeddings, train_size, seed):
+    if len(embeddings) <= train_size:
+        return embeddings
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(embeddings), size=train_size, replace=False))
+    return embeddings[rows]
+
+
+def resolve_index_params(index_type, num_vectors, dim, params=None):
+    """Fill in defaults and size-dependent values (nlist, PQ m/nbits) for an index type"""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose from: {', '.join(INDEX_TYPES)}")
+
+    resolved = dict(DEFAULT_INDEX_PARAMS[index_type])
+    resolved.update(params or {})
+
+    if "nlist" in resolved and not resolved["nlist"]:
+        resolved["nlist"] = _default_nlist(num_vectors)
+    if index_type == "ivf_pq":
+        if not resolved["m"]:
+            resolved["m"] = _default_pq_m(dim)
+        # PQ codebooks need ~39 training points per centroid
+        max_nbits = int(np.log2(max(2, num_vectors // 39)))
+        resolved["nbits"] = max(1, min(resolved["nbits"], max_nbits))
+
+    resolved["index_type"] = index_type
+    resolved["dim"] = dim
+    return resolved
+
+
+def build_index(embeddings, index_type="flat", params=None, train_size=DEFAULT_TRAIN_SIZE, seed=42):
+    """Build and populate a FAISS index of the given type
+
+    Returns (index, params) where params holds the resolved build and search
+    parameters, suitable for save_index_params.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    n, d = embeddings.shape
+    params = resolve_index_params(index_type, n, d, params)
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(d)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, params["M"])
+        index.hnsw.efConstruction = params["efConstruction"]
+    elif index_type in _SCALAR_QUANTIZERS:
+        index = faiss.IndexScalarQuantizer(d, _SCALAR_QUANTIZERS[index_type], faiss.METRIC_L2)
+    else:
+        quantizer = faiss.IndexFlatL2(d)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, d, params["nlist"], faiss.METRIC_L2)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, d, params["nlist"], params["m"], params["nbits"])
+
+    if not index.is_trained:
+        start = time.time()
+        index.train(_training_sample(embeddings, train_size, seed))
+        params["train_seconds"] = round(time.time() - start, 3)
+
+    index.add(embeddings)
+    apply_search_params(index, params)
+    return index, params
+
+
+def apply_search_params(index, params):
+    """Apply persisted query-time parameters (nprobe, efSearch, rerank_oversample) to an index"""
+    if not params:
+        return index
+    if isinstance(index, ShardedIndex):
+        for shard in index.shards:
+            apply_search_params(shard, params)
+        return index
+    if isinstance(index, RerankedIndex):
+        index.oversample = params.get("rerank_oversample", index.oversample)
+        index = index.index
+    if "nprobe" in params:
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = params["nprobe"]
+    if "efSearch" in params and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = params["efSearch"]
+    return index
+
+
+def base_index(index):
+    """The underlying FAISS index (e.g. for faiss.write_index)"""
+    return index.index if isinstance(index, RerankedIndex) else index
+
+
+class RerankedIndex:
+    """Two-pass search: compressed index for candidates, exact float32 L2 to rank them
+
+    The first pass fetches k * oversample candidates. They are re-scored
+    against the full-precision vectors, which are usually a read-only
+    memmap from load_vectors, so only candidate rows are paged in.
+    Returns (distances, ids) like faiss, with exact L2 distances.
+    """
+
+    def __init__(self, index, vectors, oversample=4):
+        self.index = index
+        self.vectors = vectors
+        self.oversample = oversample
+
+    @property
+    def ntotal(self):
+        return self.index.ntotal
+
+    @property
+    def d(self):
+        return self.index.d
+
+    def add(self, embeddings):
+        # Callers append the same rows to the vectors file (see append_vectors)
+        self.index.add(embeddings)
+
+    def search(self, queries, k, params=None):
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        num_candidates = min(self.index.ntotal, max(k, k * self.oversample))
+        _, candidates = self.index.search(queries, num_candidates, params=params)
+
+        distances = np.full((len(queries), k), np.inf, dtype="float32")
+        ids = np.full((len(queries), k), -1, dtype="int64")
+        for row, query in enumerate(queries):
+            # Sorted ids keep the memmap reads sequential
+            row_ids = np.unique(candidates[row][candidates[row] >= 0])
+            if len(row_ids) == 0:
+                continue
+            exact = ((np.asarray(self.vectors[row_ids], dtype="float32") - query) ** 2).sum(axis=1)
+            best = np.argsort(exact)[:k]
+            distances[row, :len(best)] = exact[best]
+            ids[row, :len(best)] = row_ids[best]
+        return distances, ids
+
+
+class ShardedIndex:
+    """Scatter-gather search over several indexes, each holding a contiguous id range
+
+    Shard i holds global ids offsets[i] to offsets[i + 1] - 1. A query is
+    sent to every shard in parallel (FAISS releases the GIL while
+    searching, so threads use all cores). The per-shard top-k are then
+    merged into the global top-k by distance. Shards may be
+    RerankedIndex wrappers, since all distances are exact or comparable L2.
+    """
+
+    def __init__(self, shards, max_workers=None):
+        self.shards = list(shards)
+        self.offsets = np.cumsum([0] + [shard.ntotal for shard in self.shards])
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or max(1, len(self.shards)))
+
+    @property
+    def ntotal(self):
+        return int(self.offsets[-1])
+
+    @property
+    def d(self):
+        return self.shards[0].d
+
+    def add(self, embeddings):
+        # New ids continue after the last shard
+        self.shards[-1].add(embeddings)
+        self.offsets[-1] = self.offsets[-2] + self.shards[-1].ntotal
+
+    def search(self, queries, k, mask=None, shard_search=None):
+        """Global (distances, ids) for queries, merged from every shard's top-k
+
+        mask (booleans over global ids) is split per shard and passed to
+        shard_search(shard, queries, k, shard_mask), which must then be
+        given; shards with no selected ids are skipped.
+        """
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        if mask is not None and shard_search is None:
+            raise ValueError("shard_search is required to apply a mask")
+
+        def search_shard(i):
+            shard = self.shards[i]
+            if mask is None:
+                return shard.search(queries, k) if shard_search is None else shard_search(shard, queries, k, None)
+            shard_mask = mask[self.offsets[i]:self.offsets[i + 1]]
+            if not shard_mask.any():
+                return None
+            return shard_search(shard, queries, k, shard_mask)
+
+        results = [(i, r) for i, r in enumerate(self._executor.map(search_shard, range(len(self.shards))))
+                   if r is not None]
+        return self._merge(results, len(queries), k)
+
+    def _merge(self, results, num_queries, k):
+        if not results:
+            return (np.full((num_queries, k), np.inf, dtype="float32"),
+                    np.full((num_queries, k), -1, dtype="int64"))
+        distances = np.hstack([np.asarray(D, dtype="float32") for _, (D, _) in results])
+        ids = np.hstack([np.where(I >= 0, I + self.offsets[i], -1) for i, (_, I) in results])
+        # Padding slots (-1) sort last
+        distances = np.where(ids >= 0, distances, np.inf)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        distances = np.take_along_axis(distances, order, axis=1)
+        ids = np.take_along_axis(ids, order, axis=1)
+        if ids.shape[1] < k:
+            pad = k - ids.shape[1]
+            distances = np.pad(distances, ((0, 0), (0, pad)), constant_values=np.inf)
+            ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+        return distances, ids.astype("int64")
+
+    def reconstruct_batch(self, ids):
+        """Stored vectors for global ids; raises RuntimeError if a shard can't provide them"""
+        ids = np.asarray(ids, dtype="int64")
+        shard_of = np.searchsorted(self.offsets, ids, side="right") - 1
+        vectors = np.zeros((len(ids), self.d), dtype="float32")
+        for i in np.unique(shard_of):
+            rows = np.flatnonzero(shard_of == i)
+            local = ids[rows] - self.offsets[i]
+            shard = self.shards[i]
+            if isinstance(shard, RerankedIndex):
+                vectors[rows] = shard.vectors[local]
+            else:
+                vectors[rows] = shard.reconstruct_batch(local)
+        return vectors
+
+
+def save_vectors(path, embeddings):
+    """Write float32 vectors as a raw row-major file (readable with load_vectors)"""
+    tmp_path = path + ".tmp"
+    np.ascontiguousarray(embeddings, dtype="float32").tofile(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def append_vectors(path, embeddings, num_existing):
+    """Append rows to a vectors file, first dropping any rows beyond num_existing"""
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    expected_size = num_existing * embeddings.shape[1] * 4
+    if os.path.getsize(path) < expected_size:
+        raise ValueError(f"{path} holds fewer than {num_existing} vectors")
+    with open(path, "r+b") as f:
+        f.truncate(expected_size)
+        f.seek(0, os.SEEK_END)
+        f.write(embeddings.tobytes())
+
+
+def load_vectors(path, dim):
+    """Memory-map a vectors file as a read-only (n, dim) float32 array"""
+    if os.path.getsize(path) == 0:
+        return np.zeros((0, dim), dtype="float32")
+    return np.memmap(path, dtype="float32", mode="r").reshape(-1, dim)
+
+
+def save_index_params(path, params):
+    """Persist index parameters as JSON next to the index file"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=2)
+
+
+def load_index_params(path):
+    """Load persisted index parameters, or {} when none were saved"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _sample_queries(embeddings, num_queries, seed):
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(embeddings), size=min(num_queries, len(embeddings)), replace=False)
+    return np.ascontiguousarray(embeddings[rows], dtype="float32")
+
+
+def _exact_neighbours(embeddings, queries, k):
+    flat = faiss.IndexFlatL2(embeddings.shape[1])
+    flat.add(embeddings)
+    return flat.search(queries, k)[1]
+
+
+def recall(truth, found):
+    """Fraction of the true neighbour ids (rows of truth, -1 padded) that appear in the same rows of found"""
+    hits = sum(len(set(t[t >= 0]) & set(f[f >= 0])) for t, f in zip(truth, found))
+    return hits / max(1, int((truth >= 0).sum()))
+
+
+def recall_at_k(index, embeddings, k=10, num_queries=1000, seed=0):
+    """Fraction of the exact (flat) top-k neighbours that the index also returns"""
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    queries = _sample_queries(embeddings, num_queries, seed)
+    truth = _exact_neighbours(embeddings, queries, k)
+    return recall(truth, index.search(queries, k)[1])
+
+
+def recall_report(index, embeddings, k=10, num_queries=1000, seed=0, values=None, params=None):
+    """Recall@k and per-query latency for a range of nprobe / efSearch / oversample settings
+
+    Returns a list of dicts, one per setting, so the trade-off can be
+    inspected before persisting the chosen value with save_index_params.
+    The index is left with the search parameters in params (if given).
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    queries = _sample_queries(embeddings, num_queries, seed)
+    truth = _exact_neighbours(embeddings, queries, k)
+
+    inner = base_index(index)
+    if isinstance(index, RerankedIndex):
+        param = "rerank_oversample"
+        values = values or [1, 2, 4, 8, 16]
+    elif faiss.try_extract_index_ivf(inner) is not None:
+        param = "nprobe"
+        values = values or [1, 4, 8, 16, 32, 64, 128]
+    elif hasattr(inner, "hnsw"):
+        param = "efSearch"
+        values = values or [16, 32, 64, 128, 256]
+    else:
+        param, values = None, [None]
+
+    report = []
+    for value in values:
+        if param:
+            apply_search_params(index, {param: value})
+        start = time.time()
+        _, found = index.search(queries, k)
+        ms_per_query = (time.time() - start) * 1000 / len(queries)
+        report.append({
+            "param": param,
+            "value": value,
+            f"recall@{k}": recall(truth, found),
+            "ms_per_query": round(ms_per_query, 4),
+        })
+
+    apply_search_params(index, params)
+    return report
@@ -0,0 +1,145 @@
+import json
+import os
+import re
+import faiss
+import numpy as np
+
+UNKNOWN = "Unknown"
+
+HIGH_COURTS = [
+    "Allahabad", "Andhra Pradesh", "Bombay", "Calcutta", "Chhattisgarh", "Delhi", "Gauhati",
+    "Gujarat", "Himachal Pradesh", "Jammu and Kashmir", "Jharkhand", "Karnataka", "Kerala",
+    "Madhya Pradesh", "Madras", "Manipur", "Meghalaya", "Orissa", "Patna", "Punjab and Haryana",
+    "Rajasthan", "Sikkim", "Telangana", "Tripura", "Uttarakhand",
+]
+
+_YEAR_RE = re.compile(r"\b(19[5-9]\d|20[0-4]\d)\b")
+_HIGH_COURT_RE = re.compile(
+    r"\b(?:({names})\s+high\s+court|high\s+court\s+(?:of|at)\s+(?:judicature\s+(?:at|for)\s+)?({names}))\b".format(
+        names="|".join(re.escape(name) for name in HIGH_COURTS)
+    ),
+    re.IGNORECASE,
+)
+_COURT_PATTERNS = [
+    (re.compile(r"\bsupreme\s+court\b", re.IGNORECASE), "Supreme Court"),
+    (re.compile(r"\bhigh\s+court\b", re.IGNORECASE), "High Court"),
+    (re.compile(r"\b(?:district|sessions)\s+(?:court|judge)\b", re.IGNORECASE), "District Court"),
+    (re.compile(r"\btribunal\b", re.IGNORECASE), "Tribunal"),
+    (re.compile(r"\bcommission\b", re.IGNORECASE), "Commission"),
+]
+
+# Only the start of a judgment is scanned for its year and court
+HEADER_CHARS = 3000
+
+
+def extract_year(text):
+    """First plausible judgment year in the case header, or 0 if none"""
+    match = _YEAR_RE.search(str(text)[:HEADER_CHARS])
+    return int(match.group(1)) if match else 0
+
+
+def extract_court(text):
+    """Canonical court name from the case header (e.g. "Delhi High Court"), or Unknown"""
+    header = str(text)[:HEADER_CHARS]
+    high_court = _HIGH_COURT_RE.search(header)
+    if high_court:
+        name = high_court.group(1) or high_court.group(2)
+        canonical = next(c for c in HIGH_COURTS if c.lower() == " ".join(name.lower().split()))
+        return f"{canonical} High Court"
+    for pattern, court in _COURT_PATTERNS:
+        if pattern.search(header):
+            return court
+    return UNKNOWN
+
+
+class MetadataTable:
+    """Per-case source, year and court, stored column-wise as small integer arrays
+
+    Sources and courts are dictionary-encoded (uint16 codes into name
+    lists); unknown years are 0. Row i describes corpus id i.
+    """
+
+    def __init__(self, sources, years, courts, source_names, court_names, meta=None):
+        self.sources = sources
+        self.years = years
+        self.courts = courts
+        self.source_names = list(source_names)
+        self.court_names = list(court_names)
+        self.meta = meta or {}
+
+    def __len__(self):
+        return len(self.years)
+
+    @classmethod
+    def build(cls, sources, texts, meta=None):
+        """Build from per-case source names and case texts (both in corpus id order)"""
+        source_names, court_names = [], []
+        source_codes, court_codes, years = [], [], []
+        for source, text in zip(sources, texts):
+            if source not in source_names:
+                source_names.append(source)
+            court = extract_court(text)
+            if court not in court_names:
+                court_names.append(court)
+            source_codes.append(source_names.index(source))
+            court_codes.append(court_names.index(court))
+            years.append(extract_year(text))
+        return cls(
+            np.array(source_codes, dtype=np.uint16),
+            np.array(years, dtype=np.int16),
+            np.array(court_codes, dtype=np.uint16),
+            source_names,
+            court_names,
+            meta=meta,
+        )
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ("sources", "years", "courts"):
+            np.save(os.path.join(directory, name + ".npy"), getattr(self, name))
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({**self.meta, "source_names": self.source_names, "court_names": self.court_names}, f)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        columns = {
+            name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+            for name in ("sources", "years", "courts")
+        }
+        return cls(
+            source_names=meta.pop("source_names"), court_names=meta.pop("court_names"), meta=meta, **columns
+        )
+
+    def year_range(self):
+        known = np.asarray(self.years)[np.asarray(self.years) > 0]
+        return (int(known.min()), int(known.max())) if len(known) else None
+
+    def mask(self, sources=None, year_range=None, courts=None):
+        """Boolean array over corpus ids matching all given filters (None = no filter)
+
+        Filters are dicts/lists of names; year_range is an inclusive
+        (start, end) tuple and excludes cases with unknown years.
+        """
+        selected = np.ones(len(self), dtype=bool)
+        if sources:
+            codes = [self.source_names.index(s) for s in sources if s in self.source_names]
+            selected &= np.isin(self.sources, codes)
+        if courts:
+            codes = [self.court_names.index(c) for c in courts if c in self.court_names]
+            selected &= np.isin(self.courts, codes)
+        if year_range:
+            start, end = year_range
+            selected &= (self.years >= start) & (self.years <= end)
+        return selected
+
+
+def id_selector(mask):
+    """faiss IDSelectorBitmap for a boolean mask over ids
+
+    Returns (selector, bitmap); keep the bitmap referenced for as long as the
+    selector is used, since faiss does not copy it.
+    """
+    bitmap = np.packbits(np.asarray(mask, dtype=bool), bitorder="little")
+    return faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap)), bitmap
@@ -0,0 +1,240 @@
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from utils import dataset_loader as dl
+from utils.corpus_store import CorpusStore, write_corpus
+from utils.embedder import EMBEDDING_BACKEND, EMBEDDING_MODEL, embedding_key, get_embedder
+from utils.embedding_cache import EmbeddingCache, encode_with_cache
+from utils.index_factory import load_vectors
+
+# Everything is built here first and only moved into DATA_DIR once complete
+STAGING_DIR = os.path.join(dl.DATA_DIR, "build_staging")
+MANIFEST_NAME = "build.json"
+EMBEDDINGS_SUBDIR = "embeddings"
+DEFAULT_SHARD_SIZE = 10_000
+
+# Published in this order. corpus.meta.json goes last: its presence (and record
+# count) is what marks a complete corpus to the app.
+PUBLISHED_FILES = [
+    "corpus.blob", "corpus.offsets.npy", "corpus.hashes.npy", "corpus.sources.npy",
+    os.path.basename(dl.VECTORS_PATH), os.path.basename(dl.INDEX_PATH), os.path.basename(dl.INDEX_PARAMS_PATH),
+    os.path.basename(dl.DEDUP_REPORT_PATH), os.path.basename(dl.BM25_DIR), os.path.basename(dl.METADATA_DIR),
+    os.path.basename(dl.SHARDS_DIR), "corpus.meta.json",
+]
+
+
+def _manifest_path(staging_dir):
+    return os.path.join(staging_dir, MANIFEST_NAME)
+
+
+def _load_manifest(staging_dir):
+    if not os.path.exists(_manifest_path(staging_dir)):
+        return {}
+    with open(_manifest_path(staging_dir), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(staging_dir, manifest):
+    tmp_path = _manifest_path(staging_dir) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, _manifest_path(staging_dir))
+
+
+def _shard_path(staging_dir, shard_id):
+    return os.path.join(staging_dir, EMBEDDINGS_SUBDIR, f"shard_{shard_id:05d}.npy")
+
+
+def _init_worker(num_threads):
+    # Split the cores between workers instead of every worker using all of them
+    os.environ["EMBEDDING_THREADS"] = str(num_threads)
+
+
+def _embed_shard(staging_dir, shard_id, start, end):
+    """Embed questions[start:end] of the staged corpus and save them as one checkpoint file
+
+    Runs in worker processes. The file is written under a temporary name and
+    renamed, so a shard file exists only once it is complete.
+    """
+    began = time.time()
+    corpus = CorpusStore(staging_dir)
+    cache = EmbeddingCache(dl.EMBEDDING_CACHE_PATH)
+    try:
+        vectors, num_encoded = encode_with_cache(corpus.questions[start:end], get_embedder(), embedding_key(), cache)
+    finally:
+        cache.close()
+        corpus.close()
+    path = _shard_path(staging_dir, shard_id)
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, vectors)
+    os.replace(tmp_path, path)
+    return shard_id, end - start, num_encoded, time.time() - began
+
+
+def embed_corpus(staging_dir, num_records, shard_size=DEFAULT_SHARD_SIZE, num_workers=1):
+    """Embed the staged corpus shard by shard, skipping shards already on disk
+
+    Shards run in num_workers spawned processes (inline when 1). Returns the
+    path of the concatenated float32 vectors file.
+    """
+    os.makedirs(os.path.join(staging_dir, EMBEDDINGS_SUBDIR), exist_ok=True)
+    bounds = [(i, start, min(start + shard_size, num_records))
+              for i, start in enumerate(range(0, num_records, shard_size))]
+    todo = [shard for shard in bounds if not os.path.exists(_shard_path(staging_dir, shard[0]))]
+    print(f"Embedding {num_records:,} records in {len(bounds)} shards of {shard_size:,} "
+          f"({len(bounds) - len(todo)} already done)")
+
+    def report(result, done):
+        shard_id, count, num_encoded, seconds = result
+        print(f"[{done}/{len(bounds)}] shard {shard_id}: {count:,} records "
+              f"({num_encoded:,} embedded, rest cached) in {seconds:.1f}s")
+
+    done = len(bounds) - len(todo)
+    if num_workers <= 1:
+        for shard in todo:
+            done += 1
+            report(_embed_shard(staging_dir, *shard), done)
+    else:
+        # spawn: workers load their own model instead of inheriting a forked torch runtime
+        context = multiprocessing.get_context("spawn")
+        threads = max(1, (os.cpu_count() or 1) // num_workers)
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(threads,)) as executor:
+            futures = [executor.submit(_embed_shard, staging_dir, *shard) for shard in todo]
+            for future in as_completed(futures):
+                done += 1
+                report(future.result(), done)
+
+    # Concatenate the shards, in order, into the vectors file the index is built from
+    vectors_path = dl._in_dir(dl.VECTORS_PATH, staging_dir)
+    with open(vectors_path + ".tmp", "wb") as f:
+        for shard_id, _, _ in bounds:
+            f.write(np.ascontiguousarray(np.load(_shard_path(staging_dir, shard_id)), dtype="float32").tobytes())
+    os.replace(vectors_path + ".tmp", vectors_path)
+    return vectors_path
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def publish(staging_dir=STAGING_DIR, data_dir=dl.DATA_DIR, artifacts=None):
+    """Replace the published files in data_dir with the build in staging_dir
+
+    artifacts names the PUBLISHED_FILES the build produced (default: those
+    in staging_dir). corpus.meta.json is withdrawn first and put back last.
+    While it is missing the app sees no corpus, so an app starting
+    mid-publish never pairs new files with old ones. Each file and directory
+    is swapped in with os.replace, so no path is ever half-written.
+    Published files the build doesn't have (e.g. shards/ after going back to
+    one shard) are removed rather than left behind stale.
+
+    Safe to re-run after a crash: artifacts no longer in staging_dir were
+    already moved and are left alone.
+    """
+    if artifacts is None:
+        artifacts = [name for name in PUBLISHED_FILES if os.path.exists(os.path.join(staging_dir, name))]
+    if os.path.exists(os.path.join(staging_dir, "corpus.meta.json")):
+        _remove(os.path.join(data_dir, "corpus.meta.json"))
+    for name in PUBLISHED_FILES:
+        source, target = os.path.join(staging_dir, name), os.path.join(data_dir, name)
+        if name not in artifacts:
+            _remove(target)
+        elif not os.path.exists(source):
+            # Moved by an earlier, interrupted publish
+            continue
+        elif os.path.isdir(source):
+            old = target + ".old"
+            shutil.rmtree(old, ignore_errors=True)
+            if os.path.exists(target):
+                os.replace(target, old)
+            os.replace(source, target)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(source, target)
+
+
+def run_build(shard_size=DEFAULT_SHARD_SIZE, num_workers=1, restart=False, staging_dir=STAGING_DIR):
+    """Ingest, embed (resumably) and index all DATASETS, then publish into DATA_DIR
+
+    Progress is checkpointed in staging_dir: the ingested corpus, every
+    finished embedding shard, the built indexes and the start of publishing.
+    Re-running after a crash picks up from the last completed step;
+    restart=True starts over.
+    """
+    config = {
+        "datasets": dl.DATASETS,
+        "model": EMBEDDING_MODEL,
+        "backend": EMBEDDING_BACKEND,
+        "shard_size": shard_size,
+        "dedup": os.getenv("DEDUP_CASES", "1") != "0",
+        "compression": os.getenv("CORPUS_COMPRESSION", "none"),
+        "index_type": os.getenv("FAISS_INDEX_TYPE", "flat"),
+        "index_shards": dl._num_shards(),
+        "bm25": os.getenv("BM25_INDEX", "1") != "0",
+    }
+    manifest = {} if restart else _load_manifest(staging_dir)
+    if manifest.get("config") != config:
+        if manifest:
+            print("Build settings changed since the last run; starting over")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        manifest = {"config": config}
+    os.makedirs(staging_dir, exist_ok=True)
+
+    if not manifest.get("ingested"):
+        print("Loading and parsing datasets...")
+        questions, answers, sources, info = dl.ingest_records(report_path=dl._in_dir(dl.DEDUP_REPORT_PATH, staging_dir))
+        write_corpus(staging_dir, questions, answers, compression=config["compression"],
+                     meta={"sources": info, "datasets": dl.DATASETS},
+                     sources=sources).close()
+        del questions, answers, sources
+        manifest["ingested"] = True
+        _save_manifest(staging_dir, manifest)
+    else:
+        print(f"Resuming build in {staging_dir}")
+
+    # Once indexed, the staged corpus may already be partly published, so it isn't reopened
+    if not manifest.get("indexed"):
+        corpus = CorpusStore(staging_dir)
+        try:
+            vectors_path = embed_corpus(staging_dir, len(corpus), shard_size, num_workers)
+            dim = os.path.getsize(vectors_path) // 4 // max(len(corpus), 1)
+            embeddings = load_vectors(vectors_path, dim)
+
+            index_type = config["index_type"]
+            print(f"Building {index_type} index over {len(corpus):,} vectors...")
+            index, index_params = dl._train_index(embeddings, index_type, vectors_path)
+            index_params["embedding"] = embedding_key()
+            dl._write_index(index, index_params, staging_dir)
+            del index
+
+            if config["bm25"]:
+                print("Building keyword (BM25) index...")
+                dl._build_bm25(corpus, staging_dir)
+            print("Extracting case metadata...")
+            dl._build_metadata(corpus, staging_dir)
+            if config["index_shards"] > 1:
+                print(f"Splitting into {config['index_shards']} shards...")
+                dl._build_shards(corpus, index_type, staging_dir)
+        finally:
+            corpus.close()
+        manifest["indexed"] = True
+        manifest["artifacts"] = [name for name in PUBLISHED_FILES if os.path.exists(os.path.join(staging_dir, name))]
+        _save_manifest(staging_dir, manifest)
+
+    if manifest.get("publishing"):
+        print(f"Resuming the interrupted publish into {dl.DATA_DIR}...")
+    else:
+        print(f"Publishing into {dl.DATA_DIR}...")
+        manifest["publishing"] = True
+        _save_manifest(staging_dir, manifest)
+    publish(staging_dir, dl.DATA_DIR, manifest["artifacts"])
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    print("Done. Restart the app (or roll its replicas) to serve the new index.")
@@ -0,0 +1,131 @@
+import atexit
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def normalize_query(text):
+    """Canonical form of a query for cache lookups
+
+    MiniLM's tokenizer is uncased and splits on whitespace, so case and
+    whitespace differences don't change the embedding.
+    """
+    return " ".join(str(text).split()).lower()
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU cache of (model key, normalized query) -> embedding
+
+    The model key names the backend too (see embedder.embedding_key), so
+    queries embedded by one backend aren't served after switching to another.
+
+    Bounded both by number of entries and by total vector bytes; the least
+    recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_name, query):
+        key = (model_name, normalize_query(query))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model_name, query, vector):
+        key = (model_name, normalize_query(query))
+        vector = np.array(vector, dtype="float32")
+        vector.setflags(write=False)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = vector
+            self._bytes += vector.nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def save(self, path):
+        """Write entries (oldest first) to an .npz file"""
+        with self._lock:
+            items = list(self._entries.items())
+        if not items:
+            return
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            models=np.array([model for (model, _), _ in items]),
+            queries=np.array([query for (_, query), _ in items]),
+            vectors=np.vstack([vector for _, vector in items]),
+        )
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Load entries saved with save(); missing or unreadable files are ignored"""
+        if not os.path.exists(path):
+            return
+        try:
+            with np.load(path) as data:
+                for model, query, vector in zip(data["models"], data["queries"], data["vectors"]):
+                    self.put(str(model), str(query), vector)
+        except Exception as e:
+            print(f"Ignoring unreadable query cache {path}: {e}")
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache():
+    """Process-wide query embedding cache, configured from the environment
+
+    QUERY_CACHE_ENTRIES / QUERY_CACHE_BYTES bound its size. If
+    QUERY_CACHE_PATH is set, entries are loaded from it on first use and
+    written back when the process exits.
+    """
+    global _query_cache
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                cache = QueryEmbeddingCache(
+                    max_entries=int(os.getenv("QUERY_CACHE_ENTRIES", 10000)),
+                    max_bytes=int(os.getenv("QUERY_CACHE_BYTES", 64 * 1024 * 1024)),
+                )
+                path = os.getenv("QUERY_CACHE_PATH")
+                if path:
+                    cache.load(path)
+                    atexit.register(cache.save, path)
+                _query_cache = cache
+    return _query_cache
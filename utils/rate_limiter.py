@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows: buckets are then only shared within a process
+    fcntl = None
+
+try:
+    # Connection failures of the REST transport (GEMINI_API_ENDPOINT) are requests' own exception types
+    from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout
+    CONNECTION_ERRORS = (ConnectionError, TimeoutError, RequestsConnectionError, RequestsTimeout)
+except ImportError:
+    CONNECTION_ERRORS = (ConnectionError, TimeoutError)
+
+# Requests per minute allowed per API key (off by default; set it to the key's quota) and how many may burst at once
+REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_RPM", "0"))
+BURST = int(os.getenv("GEMINI_BURST", "5"))
+# If set, each key's bucket lives in a file here, shared by every app process on the machine
+SHARED_DIR = os.getenv("GEMINI_RATE_LIMIT_DIR")
+# Retry delays: a random wait up to BACKOFF_BASE_S * 2^attempt, capped at BACKOFF_MAX_S
+BACKOFF_BASE_S = float(os.getenv("GEMINI_BACKOFF_BASE_S", "0.5"))
+BACKOFF_MAX_S = float(os.getenv("GEMINI_BACKOFF_MAX_S", "20"))
+
+# HTTP statuses worth retrying: rate limited, server errors, gateway timeouts
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RETRYABLE_GRPC = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "INTERNAL", "DEADLINE_EXCEEDED"}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, holding at most capacity"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, tokens, updated, now):
+        return min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+    def _try_take(self):
+        """Take a token if one is available (returns 0), else return the seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = self._refill(self._tokens, self._updated, now)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout=None):
+        """Wait for a token; False if none would be available within timeout seconds"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._try_take()
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket whose state is kept in a flock-ed file, so all processes on a host share it"""
+
+    def __init__(self, path, rate, capacity):
+        super().__init__(rate, capacity)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _try_take(self):
+        with self._lock, open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    state = {}
+                # Wall-clock time, since monotonic clocks aren't comparable across processes
+                now = time.time()
+                tokens = self._refill(state.get("tokens", self.capacity), state.get("updated", now), now)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({"tokens": tokens, "updated": now}))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return wait
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key):
+    """The bucket limiting requests made with api_key, or None when GEMINI_RPM=0
+
+    One bucket per key per process, or one per key per host with
+    GEMINI_RATE_LIMIT_DIR set.
+    """
+    if REQUESTS_PER_MINUTE <= 0:
+        return None
+    key = hashlib.sha256(str(api_key).encode("utf-8")).hexdigest()[:16]
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            rate = REQUESTS_PER_MINUTE / 60
+            if SHARED_DIR and fcntl is not None:
+                bucket = FileTokenBucket(os.path.join(SHARED_DIR, f"gemini_{key}.bucket"), rate, BURST)
+            else:
+                bucket = TokenBucket(rate, BURST)
+            _buckets[key] = bucket
+    return bucket
+
+
+def is_retryable(error):
+    """True for rate-limit, server-side and connection errors, which may succeed if retried"""
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        # google.api_core exceptions carry the HTTP status
+        return code in RETRYABLE_STATUS
+    if callable(code):
+        # Raw grpc errors carry a StatusCode
+        try:
+            return getattr(code(), "name", None) in RETRYABLE_GRPC
+        except Exception:
+            return False
+    return False
+
+
+def backoff_delay(attempt):
+    """Seconds to wait before retry number attempt (0-based): full-jitter exponential backoff"""
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt))
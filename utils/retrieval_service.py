@@ -0,0 +1,126 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from utils.embedder import encode_queries
+from utils.embedding_search import search_many_with_embeddings
+
+# A batch is closed when it reaches MAX_BATCH_SIZE queries or MAX_WAIT_MS after its first query
+MAX_BATCH_SIZE = int(os.getenv("RETRIEVAL_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("RETRIEVAL_BATCH_WAIT_MS", "5"))
+
+_STOP = object()
+
+
+class _Request:
+    def __init__(self, query, k, mode, bm25, filters, metadata):
+        self.query = query
+        self.k = k
+        self.mode = mode
+        self.bm25 = bm25
+        self.filters = filters
+        self.metadata = metadata
+        self.future = Future()
+
+
+class RetrievalService:
+    """Background worker that owns query encoding and index search for all sessions
+
+    Concurrent search() calls are queued and served in micro-batches. Each
+    batch gets one embedder forward pass, plus one FAISS search for all of
+    its unfiltered queries, dense and hybrid (see
+    search_many_with_embeddings). Filtered queries share the forward pass
+    but are searched one by one. Results are in the search_similar_cases
+    format.
+    """
+
+    def __init__(self, index, questions, answers, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.index = index
+        self.questions = questions
+        self.answers = answers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._worker = threading.Thread(target=self._run, name="retrieval-service", daemon=True)
+        self._worker.start()
+
+    def submit(self, query, k=5, mode="dense", bm25=None, filters=None, metadata=None):
+        """Queue a query; returns a Future resolving to its result list"""
+        request = _Request(query, k, mode, bm25, filters, metadata)
+        self._queue.put(request)
+        return request.future
+
+    def search(self, query, k=5, mode="dense", bm25=None, filters=None, metadata=None, timeout=None):
+        """Blocking search_similar_cases through the shared worker; [] on error, like search_similar_cases"""
+        try:
+            return self.submit(query, k, mode, bm25, filters, metadata).result(timeout)
+        except Exception as e:
+            print(f"Error in RetrievalService.search: {str(e)}")
+            return []
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "requests": self._requests,
+                "batches": self._batches,
+                "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+    def close(self):
+        """Stop the worker after the requests already queued"""
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def _next_batch(self):
+        """Block for one request, then gather more until the batch is full or the wait expires"""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                # Serve this batch, then stop
+                self._queue.put(_STOP)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            with self._stats_lock:
+                self._requests += len(batch)
+                self._batches += 1
+            try:
+                self._serve(batch)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _serve(self, batch):
+        embeddings = encode_queries([request.query for request in batch], batch_size=self.max_batch_size)
+        searches = [
+            {"query": request.query, "k": request.k, "mode": request.mode, "bm25": request.bm25,
+             "filters": request.filters, "metadata": request.metadata}
+            for request in batch
+        ]
+        outcomes = search_many_with_embeddings(searches, embeddings, self.index, self.questions, self.answers)
+        for request, outcome in zip(batch, outcomes):
+            if isinstance(outcome, Exception):
+                request.future.set_exception(outcome)
+            else:
+                request.future.set_result(outcome)
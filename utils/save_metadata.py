@@ -7,8 +7,8 @@ def save_metadata():
     questions, answers, embedder, index, dataset_info = load_combined_datasets()
     
     metadata = {
-        'questions': questions,
-        'answers': answers,
+        'questions': list(questions),
+        'answers': list(answers),
         'embedder': embedder,
         'dataset_info': dataset_info
     }
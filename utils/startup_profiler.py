@@ -0,0 +1,116 @@
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# PROFILE_STARTUP=1 records how long each module's first import and each
+# startup stage takes, for the first time it happens in this process
+ENABLED = os.getenv("PROFILE_STARTUP", "0") == "1"
+
+_lock = threading.Lock()
+_imports = {}    # module name -> {"seconds", "imported_by"}
+_stages = {}     # stage name -> {"seconds", "rss_delta_bytes"}
+_importing = threading.local()
+_original_import = builtins.__import__
+_installed = False
+_printed = False
+
+
+def _rss_bytes():
+    """Resident set size of this process, or None where /proc isn't available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _module_name(name, globals, level):
+    """Absolute name of the module an import statement loads, or None if it can't be resolved"""
+    if not level:
+        return name or None
+    try:
+        return importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__") or "")
+    except (ImportError, ValueError):
+        return None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # The full name, so e.g. utils.embedder is timed although utils itself is already loaded
+    module = _module_name(name, globals, level)
+    if not module or module in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    stack = getattr(_importing, "stack", None)
+    if stack is None:
+        stack = _importing.stack = []
+    parent = stack[-1] if stack else None
+    stack.append(module)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        seconds = time.perf_counter() - start
+        stack.pop()
+        # Inclusive time: a module's entry also covers the modules it imported first.
+        # Failed (e.g. optional) imports aren't recorded.
+        if module in sys.modules:
+            with _lock:
+                _imports.setdefault(module, {"seconds": seconds, "imported_by": parent})
+
+
+def install():
+    """Start timing imports (call before the imports to be measured); no-op unless ENABLED"""
+    global _installed
+    if ENABLED and not _installed:
+        builtins.__import__ = _timed_import
+        _installed = True
+
+
+@contextmanager
+def stage(name):
+    """Time a startup stage (e.g. loading the index); only its first run is recorded"""
+    if not ENABLED or name in _stages:
+        yield
+        return
+    rss_before, start = _rss_bytes(), time.perf_counter()
+    try:
+        yield
+    finally:
+        rss_after = _rss_bytes()
+        with _lock:
+            _stages.setdefault(name, {
+                "seconds": time.perf_counter() - start,
+                "rss_delta_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            })
+
+
+def report(min_seconds=0.01):
+    """{"stages": [...], "imports": [...]}, slowest first; imports under min_seconds are left out"""
+    with _lock:
+        stages = [{"stage": name, **values} for name, values in _stages.items()]
+        imports = [{"module": name, **values} for name, values in _imports.items() if values["seconds"] >= min_seconds]
+    return {
+        "stages": stages,
+        "imports": sorted(imports, key=lambda item: -item["seconds"]),
+    }
+
+
+def print_report(min_seconds=0.01, once=False):
+    """Print the profile to stdout; with once=True only the first call in the process prints"""
+    global _printed
+    if once and _printed:
+        return
+    _printed = True
+    profile = report(min_seconds)
+    print("Startup stages:")
+    for item in profile["stages"]:
+        rss = f", +{item['rss_delta_bytes'] / 1e6:.0f} MB RSS" if item["rss_delta_bytes"] is not None else ""
+        print(f"  {item['stage']:<28} {item['seconds']:8.3f}s{rss}")
+    print("Imports (inclusive):")
+    for item in profile["imports"]:
+        via = f"  (via {item['imported_by']})" if item["imported_by"] else ""
+        print(f"  {item['module']:<28} {item['seconds']:8.3f}s{via}")
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import threading
+import time
+
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "summary_cache.sqlite"
+))
+
+
+class SummaryCache:
+    """Persistent LRU cache of Gemini case summaries, stored in SQLite
+
+    Keyed by (case content hash, prompt version, model), so rebuilding the
+    corpus keeps summaries of unchanged cases and changing the prompt or
+    model invalidates them. Holds at most max_entries summaries; the least
+    recently used are evicted. It also counts how often each case is
+    retrieved, which the warm-up job uses to pick cases to pre-summarize.
+    The file can be shared by several app processes.
+    """
+
+    def __init__(self, path, max_entries=50000, timeout=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " case_hash BLOB NOT NULL,"
+            " prompt_version TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " summary TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (case_hash, prompt_version, model))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS retrievals ("
+            " case_hash BLOB PRIMARY KEY,"
+            " count INTEGER NOT NULL,"
+            " last_retrieved REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, hashes, prompt_version, model, chunk_size=500):
+        """Return {hash: summary} for the hashes that are cached, marking them as recently used"""
+        found = {}
+        hashes = list(set(hashes))
+        with self._lock:
+            for start in range(0, len(hashes), chunk_size):
+                chunk = hashes[start:start + chunk_size]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT case_hash, summary FROM summaries WHERE prompt_version = ? AND model = ?"
+                    f" AND case_hash IN ({placeholders})",
+                    [prompt_version, model, *chunk],
+                )
+                for h, summary in rows:
+                    found[bytes(h)] = summary
+            if found:
+                self._conn.executemany(
+                    "UPDATE summaries SET last_used = ? WHERE case_hash = ? AND prompt_version = ? AND model = ?",
+                    [(time.time(), h, prompt_version, model) for h in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put(self, case_hash, prompt_version, model, summary):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (case_hash, prompt_version, model, summary, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (case_hash, prompt_version, model, summary, time.time()),
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM summaries WHERE rowid IN"
+                    " (SELECT rowid FROM summaries ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+            self._conn.commit()
+
+    def record_retrievals(self, hashes):
+        """Count one retrieval of each case (hashes of the cases a search returned)"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO retrievals (case_hash, count, last_retrieved) VALUES (?, 1, ?)"
+                " ON CONFLICT (case_hash) DO UPDATE SET count = count + 1, last_retrieved = excluded.last_retrieved",
+                [(h, now) for h in set(hashes)],
+            )
+            self._conn.commit()
+
+    def most_retrieved(self, limit):
+        """Hashes of the limit most often retrieved cases, most frequent first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT case_hash FROM retrievals ORDER BY count DESC, last_retrieved DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [bytes(h) for h, in rows]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0],
+            }
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_summary_cache = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache():
+    """Process-wide summary cache at SUMMARY_CACHE_PATH, or None when SUMMARY_CACHE=0
+
+    SUMMARY_CACHE_ENTRIES bounds its size.
+    """
+    global _summary_cache
+    if os.getenv("SUMMARY_CACHE", "1") == "0":
+        return None
+    if _summary_cache is None:
+        with _summary_cache_lock:
+            if _summary_cache is None:
+                _summary_cache = SummaryCache(
+                    SUMMARY_CACHE_PATH, max_entries=int(os.getenv("SUMMARY_CACHE_ENTRIES", "50000"))
+                )
+    return _summary_cache
@@ -0,0 +1,137 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.corpus_store import record_hash
+from utils.gemini_interface import GEMINI_MODEL, SUMMARY_PROMPT_VERSION, generate_case_summary
+from utils.summary_cache import get_summary_cache
+
+# Most Gemini calls in flight at once, across all sessions
+MAX_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "8"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide thread pool for Gemini calls, created on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, MAX_CONCURRENCY), thread_name_prefix="gemini")
+    return _executor
+
+
+class SummaryBatch:
+    """Case summaries being generated in the background; see submit_summaries"""
+
+    def __init__(self, cases, api_key):
+        self.cases = cases
+        self._cache = get_summary_cache()
+        self._hashes = [record_hash(case['question'], case['answer']) for case in cases]
+        cached = {}
+        if self._cache is not None:
+            self._cache.record_retrievals(self._hashes)
+            cached = self._cache.get_many(self._hashes, SUMMARY_PROMPT_VERSION, GEMINI_MODEL)
+
+        self._summarized = [None] * len(cases)
+        self._futures = {}
+        executor = get_executor()
+        for i, case in enumerate(cases):
+            if self._hashes[i] in cached:
+                self._summarized[i] = {"summary": cached[self._hashes[i]], "similarity": case['similarity']}
+            else:
+                future = executor.submit(generate_case_summary, case['question'], case['answer'], api_key)
+                self._futures[future] = i
+                future.add_done_callback(self._cache_summary)
+
+    def _cache_summary(self, future):
+        """Cache a summary as soon as it is generated, even if result() is never called
+
+        Runs on the worker thread, e.g. while the caller is still streaming
+        an analysis that may fail.
+        """
+        if self._cache is None or future.cancelled() or future.exception() is not None:
+            return
+        i = self._futures[future]
+        try:
+            self._cache.put(self._hashes[i], SUMMARY_PROMPT_VERSION, GEMINI_MODEL, future.result())
+        except Exception as e:
+            print(f"Error caching summary of case {i + 1}: {str(e)}")
+
+    def result(self, on_progress=None):
+        """Wait for the summaries; returns them in rank order (see summarize_cases)
+
+        on_progress(done, total) is called on the calling thread, so it may
+        update Streamlit widgets.
+        """
+        for done, future in enumerate(as_completed(self._futures), 1):
+            if on_progress:
+                on_progress(done, len(self._futures))
+            i = self._futures[future]
+            if self._summarized[i] is not None:
+                continue
+            try:
+                summary = future.result()
+                self._summarized[i] = {"summary": summary, "similarity": self.cases[i]['similarity']}
+            except Exception as e:
+                print(f"Error summarizing case {i + 1}: {str(e)}")
+                self._summarized[i] = {
+                    "summary": f"⚠️ Summary unavailable: {str(e)}",
+                    "similarity": self.cases[i]['similarity'],
+                    "error": str(e),
+                }
+        return self._summarized
+
+
+def submit_summaries(cases, api_key):
+    """Start summarizing every case concurrently and return a SummaryBatch
+
+    The caller can do other work (e.g. stream the analysis) before
+    collecting the summaries with batch.result().
+    """
+    return SummaryBatch(cases, api_key)
+
+
+def summarize_cases(cases, api_key, on_progress=None):
+    """Summarize every case concurrently; returns the summaries in rank order
+
+    Summaries already in the summary cache are reused; only the others go
+    to Gemini, and are cached as soon as they succeed. Each result is
+    {"summary", "similarity"}. A case whose summary failed also has an
+    "error" and a placeholder summary, so it doesn't lose the others.
+    """
+    return submit_summaries(cases, api_key).result(on_progress)
+
+
+def warm_summary_cache(corpus, api_key, top=1000):
+    """Pre-summarize the top most retrieved cases of corpus that aren't cached yet
+
+    Uses the retrieval counts the app records in the summary cache; cases
+    no longer in corpus are skipped. Returns (summarized, failed).
+    """
+    cache = get_summary_cache()
+    if cache is None:
+        print("Summary cache is disabled (SUMMARY_CACHE=0)")
+        return 0, 0
+    wanted = cache.most_retrieved(top)
+    cached = cache.get_many(wanted, SUMMARY_PROMPT_VERSION, GEMINI_MODEL)
+    ids = {h: i for i, h in enumerate(corpus.hashes)}
+    todo = [ids[h] for h in wanted if h not in cached and h in ids]
+    print(f"{len(wanted):,} most retrieved cases: {len(cached):,} already cached, {len(todo):,} to summarize")
+
+    executor = get_executor()
+    futures = {executor.submit(generate_case_summary, corpus.questions[i], corpus.answers[i], api_key): i
+               for i in todo}
+    summarized = failed = 0
+    for future in as_completed(futures):
+        i = futures[future]
+        try:
+            cache.put(corpus.hashes[i], SUMMARY_PROMPT_VERSION, GEMINI_MODEL, future.result())
+            summarized += 1
+        except Exception as e:
+            print(f"Error summarizing case {i}: {str(e)}")
+            failed += 1
+        if (summarized + failed) % 50 == 0:
+            print(f"[{summarized + failed}/{len(todo)}] summarized")
+    return summarized, failed
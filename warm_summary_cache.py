@@ -0,0 +1,32 @@
+import argparse
+import os
+from dotenv import load_dotenv
+from utils.corpus_store import CorpusStore, corpus_exists
+from utils.summary_cache import SUMMARY_CACHE_PATH
+from utils.summary_executor import warm_summary_cache
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(
+        description=f"Pre-summarize the most retrieved cases into the summary cache ({SUMMARY_CACHE_PATH})"
+    )
+    parser.add_argument("--top", type=int, default=1000, help="How many of the most retrieved cases to cover")
+    parser.add_argument("--api-key", default=os.getenv("GEMINI_API_KEY"), help="Gemini API key (default: GEMINI_API_KEY)")
+    args = parser.parse_args()
+    if not args.api_key:
+        parser.error("no Gemini API key; set GEMINI_API_KEY or pass --api-key")
+    if not corpus_exists(DATA_DIR):
+        raise SystemExit(f"No corpus store in {DATA_DIR}; run build_index.py first")
+
+    corpus = CorpusStore(DATA_DIR)
+    summarized, failed = warm_summary_cache(corpus, args.api_key, args.top)
+    print(f"Done: {summarized:,} summarized, {failed:,} failed")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()